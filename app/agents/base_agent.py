@@ -1,13 +1,104 @@
+import copy
 import json
-from typing import Optional, Any, Dict
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Optional, Any, Dict, Iterator
 
 from app.config import (
     GEMINI_API_KEY,
     GEMINI_MODEL,
+    LLM_CONSTRAINED_OUTPUT,
+    LLM_HEDGE_MODEL,
+    LLM_HEDGE_PROVIDER,
+    LLM_MAX_OUTPUT_TOKENS,
     LLM_PROVIDER,
+    LLM_STREAM,
+    OLLAMA_CONNECT_TIMEOUT_S,
     OLLAMA_MODEL,
+    OLLAMA_POOL_SIZE,
+    OLLAMA_READ_TIMEOUT_S,
     OLLAMA_URL,
 )
+from app.agents.hedging import HEDGE_STATS, get_latency_tracker
+from app.agents.json_repair import JSON_STATS, loads_lenient
+from app.agents.json_stream import JsonStreamTracker
+from app.agents.llm_cache import get_llm_cache, make_cache_key
+from app.agents.llm_scheduler import LLMCallError, get_scheduler, parse_retry_after
+
+_ollama_session = None
+_ollama_session_lock = threading.Lock()
+
+# Stop reasons of a call that returned the model's whole answer (non-streamed calls have none)
+_COMPLETE_STOP_REASONS = ("done", "json_complete")
+
+
+def _lenient_object(text: Optional[str]) -> Optional[Dict[str, Any]]:
+    """The JSON object in `text` after local repair, or None when there isn't one."""
+    try:
+        result = loads_lenient(text or "", expect="{")
+    except json.JSONDecodeError:
+        return None
+    return result if isinstance(result, dict) else None
+
+
+def get_ollama_session():
+    """
+    One pooled keep-alive session per process, shared by every Ollama agent,
+    so consecutive calls (and the JSON corrective retry) reuse connections.
+    """
+    global _ollama_session
+    with _ollama_session_lock:
+        if _ollama_session is None:
+            from app.http_session import build_session  # lazy import
+
+            _ollama_session = build_session(pool_size=OLLAMA_POOL_SIZE)
+        return _ollama_session
+
+
+def _ollama_error(r) -> LLMCallError:
+    return LLMCallError(
+        f"Ollama error {r.status_code}: {r.text}",
+        status=r.status_code,
+        retry_after=parse_retry_after(r.headers.get("Retry-After")),
+    )
+
+
+def json_schema_for(example: Any) -> Dict[str, Any]:
+    """
+    JSON Schema for an agent's example-style schema (the dicts shown in the
+    prompts): dicts become objects with every key required, lists become
+    arrays of their first item, "int" becomes an integer and any other
+    description a string.
+    """
+    if isinstance(example, dict):
+        return {
+            "type": "object",
+            "properties": {k: json_schema_for(v) for k, v in example.items()},
+            "required": list(example),
+        }
+    if isinstance(example, list):
+        return {"type": "array", "items": json_schema_for(example[0] if example else "")}
+    if example == "int":
+        return {"type": "integer"}
+    return {"type": "string"}
+
+
+def _gemini_schema(schema: Dict[str, Any]) -> Dict[str, Any]:
+    """JSON Schema → the OpenAPI subset Gemini's response_schema takes (upper-case types)."""
+    out: Dict[str, Any] = {}
+    for key, value in schema.items():
+        if key in ("additionalProperties", "$schema", "title"):
+            continue
+        if key == "type":
+            out[key] = value.upper()
+        elif key == "properties":
+            out[key] = {name: _gemini_schema(sub) for name, sub in value.items()}
+        elif key == "items":
+            out[key] = _gemini_schema(value)
+        else:
+            out[key] = value
+    return out
 
 
 class BaseAgent:
@@ -25,6 +116,32 @@ class BaseAgent:
 
     Other agents (ExtractionAgent, SynthesisAgent, CriticAgent) should subclass this
     and reuse _generate_text / _generate_json.
+
+    Responses go through the shared LLM response cache (app/agents/llm_cache.py);
+    pass use_cache=False to always call the model.
+
+    With streaming on (LLM_STREAM, or stream=...), tokens are consumed as they
+    arrive: JSON requests stop as soon as the top-level object closes, and
+    every request stops at max_output_tokens. Timings of the latest call
+    (including time to first token) are kept in `last_call`.
+
+    JSON output that doesn't parse is repaired locally (app/agents/json_repair.py)
+    before falling back to a corrective LLM call. With constrained output
+    (LLM_CONSTRAINED_OUTPUT, or constrained_output=...) set to "json" the
+    provider is asked for JSON only (Ollama format="json", Gemini
+    response_mime_type); "schema" also passes the JSON schema given to
+    _generate_json (Ollama format=<schema>, Gemini response_schema).
+
+    Model calls go through the provider's shared scheduler
+    (app/agents/llm_scheduler.py): per-provider concurrency and
+    requests-per-minute limits, and retries with backoff on rate limits,
+    5xx errors and timeouts.
+
+    With hedging (LLM_HEDGE_PROVIDER, or hedge_provider=...), a call still
+    running after the primary model's p95 latency is also sent to the
+    secondary provider/model; the first answer wins and a streamed loser is
+    cancelled (app/agents/hedging.py). Answers are cached under the primary's
+    key whichever side produced them.
     """
 
     def __init__(
@@ -33,8 +150,23 @@ class BaseAgent:
         provider: Optional[str] = None,
         gemini_api_key: Optional[str] = None,
         model_name: Optional[str] = None,
+        use_cache: bool = True,
+        stream: Optional[bool] = None,
+        max_output_tokens: Optional[int] = None,
+        constrained_output: Optional[str] = None,
+        hedge_provider: Optional[str] = None,
+        hedge_model_name: Optional[str] = None,
     ):
         self.system_instruction = system_instruction or ""
+        self.cache = get_llm_cache() if use_cache else None
+        self.stream = LLM_STREAM if stream is None else stream
+        self.max_output_tokens = max_output_tokens or LLM_MAX_OUTPUT_TOKENS
+        self.constrained_output = (constrained_output or LLM_CONSTRAINED_OUTPUT or "off").strip().lower()
+        if self.constrained_output not in ("off", "json", "schema"):
+            raise ValueError(f"Unsupported constrained output mode: {self.constrained_output!r}")
+        # Anything that changes the model's output belongs here; it is part of the cache key
+        self.generation_params: Dict[str, Any] = {"max_output_tokens": self.max_output_tokens}
+        self.last_call: Optional[Dict[str, Any]] = None
 
         # Resolve provider (agent override → global config → default)
         self.provider = (provider or LLM_PROVIDER or "gemini").strip().lower()
@@ -63,35 +195,297 @@ class BaseAgent:
             # Ollama is a local HTTP server (default http://localhost:11434)
             self.model_name = model_name or OLLAMA_MODEL
             self.ollama_generate_url = OLLAMA_URL.rstrip("/") + "/api/generate"
+            self.session = get_ollama_session()
+            self.timeout = (OLLAMA_CONNECT_TIMEOUT_S, OLLAMA_READ_TIMEOUT_S)
 
         else:
             raise ValueError(f"Unsupported provider: {self.provider!r}")
 
-    def _generate_text(self, prompt: str) -> str:
+        self.scheduler = get_scheduler(self.provider)
+        self.latency = get_latency_tracker(self.provider, self.model_name)
+
+        # Secondary agent for hedged requests (same instructions and limits, no cache, no hedging)
+        self.hedge_agent: Optional["BaseAgent"] = None
+        hedge_provider = (hedge_provider if hedge_provider is not None else LLM_HEDGE_PROVIDER).strip().lower()
+        if hedge_provider:
+            secondary = BaseAgent(
+                system_instruction=self.system_instruction,
+                provider=hedge_provider,
+                model_name=hedge_model_name or LLM_HEDGE_MODEL or None,
+                use_cache=False,
+                stream=self.stream,
+                max_output_tokens=self.max_output_tokens,
+                constrained_output=self.constrained_output,
+                hedge_provider="",
+            )
+            if (secondary.provider, secondary.model_name) != (self.provider, self.model_name):
+                self.hedge_agent = secondary
+
+    def _response_format(self, json_mode: bool, schema: Optional[Dict[str, Any]]) -> Any:
+        """What to constrain the output to: None, "json", or a JSON schema dict."""
+        if not json_mode or self.constrained_output == "off":
+            return None
+        if self.constrained_output == "schema" and schema:
+            return schema
+        return "json"
+
+    def _generate_text(self, prompt: str, json_mode: bool = False, schema: Optional[Dict[str, Any]] = None) -> str:
         """
         Simple text generation used by agents.
+
+        Served from the LLM response cache when an identical request
+        (provider, model, system instruction, prompt, params) was answered before.
+        Only complete answers are cached: a stream stopped at max_output_tokens
+        or cancelled is returned but not stored, and so is a `json_mode`
+        answer that doesn't hold a JSON object.
+        `json_mode` lets a streamed call stop once the JSON value is complete;
+        `schema` is used by the "schema" constrained output mode.
         """
-        if self.provider == "gemini":
-            resp = self.model.generate_content(prompt)
-            return (resp.text or "").strip()
+        self.last_call = None
+        fmt = self._response_format(json_mode, schema)
+        if self.cache is None or not self.cache.enabled:
+            return self._call_model(prompt, json_mode, fmt)
+
+        params = dict(self.generation_params, json=True) if json_mode else self.generation_params
+        if fmt is not None:
+            params = dict(params, format=fmt)
+        key = make_cache_key(self.provider, self.model_name, self.system_instruction, prompt, params)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.last_call = {"cached": True}
+            return cached
+
+        text = self._call_model(prompt, json_mode, fmt)
+        # A stream cut short (max_tokens, cancelled) isn't the model's whole answer
+        stop_reason = (self.last_call or {}).get("stop_reason", "done")
+        if text and stop_reason in _COMPLETE_STOP_REASONS and (not json_mode or _lenient_object(text) is not None):
+            self.cache.put(key, text, provider=self.provider, model=self.model_name)
+        return text
+
+    def _gemini_generation_config(self, fmt: Any) -> Dict[str, Any]:
+        config: Dict[str, Any] = {"max_output_tokens": self.max_output_tokens}
+        if fmt is not None:
+            config["response_mime_type"] = "application/json"
+            if isinstance(fmt, dict):
+                config["response_schema"] = _gemini_schema(fmt)
+        return config
+
+    def _ollama_payload(self, prompt: str, stream: bool, fmt: Any) -> Dict[str, Any]:
+        payload = {
+            "model": self.model_name,
+            "prompt": prompt,
+            "stream": stream,
+            "options": {"num_predict": self.max_output_tokens},
+        }
+        if fmt is not None:
+            payload["format"] = fmt
+        return payload
+
+    def _call_model(self, prompt: str, json_mode: bool = False, fmt: Any = None) -> str:
+        if self.hedge_agent is not None:
+            return self._call_hedged(prompt, json_mode, fmt)
+        return self._call_scheduled(prompt, json_mode, fmt)
+
+    def _call_scheduled(
+        self, prompt: str, json_mode: bool, fmt: Any, cancel: Optional[threading.Event] = None
+    ) -> str:
+        """
+        One model call through the provider's scheduler (with retries). Its
+        latency is recorded even when it was cancelled, as a lower bound, so
+        hedging away slow calls doesn't drag the p95 down.
+        """
+        def _attempt() -> str:
+            if cancel is not None and cancel.is_set():
+                return ""
+            return self._call_model_once(prompt, json_mode, fmt, cancel)
+
+        started = time.perf_counter()
+        try:
+            return self.scheduler.call(_attempt)
+        finally:
+            self.latency.record(time.perf_counter() - started)
+
+    def _call_hedged(self, prompt: str, json_mode: bool, fmt: Any) -> str:
+        """
+        Start the primary call; if it hasn't finished within the hedge delay
+        (or fails before then), send the same request to the secondary and
+        return whichever answer arrives first. The other side is cancelled.
+
+        Both sides always stream, whatever `stream` says: a cancelled stream
+        stops at its next chunk and closes the connection (which stops Ollama
+        generating), so the loser gives back its scheduler slot right away
+        instead of holding it, and a rate token's worth of capacity, until a
+        full non-streamed answer nobody reads comes back.
+        """
+        delay = self.latency.hedge_delay()
+        primary_label = f"{self.provider}:{self.model_name}"
+        secondary = copy.copy(self.hedge_agent)
+        secondary_label = f"{secondary.provider}:{secondary.model_name}"
+
+        # Both sides run on shallow copies so a cancelled call finishing late can't overwrite last_call
+        runner = copy.copy(self)
+        runner.stream = secondary.stream = True
+        cancels = {primary_label: threading.Event(), secondary_label: threading.Event()}
+        pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="llm-hedge")
+        try:
+            futures = {
+                pool.submit(runner._call_scheduled, prompt, json_mode, fmt, cancels[primary_label]):
+                    (primary_label, runner),
+            }
+            done, _ = wait(futures, timeout=delay)
+            primary = next(iter(futures))
+            failover = bool(done) and primary.exception() is not None
+            if done and not failover:
+                self.last_call = runner.last_call
+                HEDGE_STATS.record(primary_label, hedged=False)
+                return primary.result()
+
+            if failover:
+                print(f"[llm] {primary_label} failed ({primary.exception()}); failing over to {secondary_label}")
+                futures.pop(primary)
+            futures[pool.submit(secondary._call_scheduled, prompt, json_mode, fmt, cancels[secondary_label])] = (
+                secondary_label, secondary,
+            )
 
-        if self.provider == "ollama":
-            import requests  # lazy import
+            pending = set(futures)
+            errors = [primary.exception()] if failover else []
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    if fut.exception() is not None:
+                        errors.append(fut.exception())
+                        continue
+                    label, agent = futures[fut]
+                    for other, event in cancels.items():
+                        if other != label:
+                            event.set()
+                    for loser in pending:
+                        HEDGE_STATS.record_cancel()
+                        # Done once _call_scheduled has left the scheduler slot
+                        loser.add_done_callback(
+                            lambda _, t=time.perf_counter(): HEDGE_STATS.record_release(time.perf_counter() - t)
+                        )
+                    self.last_call = dict(agent.last_call or {}, provider=label, hedged=True)
+                    HEDGE_STATS.record(label, hedged=True, failover=failover)
+                    return fut.result()
+            raise errors[0]
+        finally:
+            pool.shutdown(wait=False)
+
+    def _call_model_once(
+        self, prompt: str, json_mode: bool = False, fmt: Any = None, cancel: Optional[threading.Event] = None
+    ) -> str:
+        if self.stream:
+            return self._call_model_streaming(prompt, json_mode, fmt, cancel)
+
+        started = time.perf_counter()
+        if self.provider == "gemini":
+            resp = self.model.generate_content(
+                prompt,
+                generation_config=self._gemini_generation_config(fmt),
+            )
+            text = (resp.text or "").strip()
 
-            payload = {
-                "model": self.model_name,
-                "prompt": prompt,
-                "stream": False,
-            }
-            r = requests.post(self.ollama_generate_url, json=payload, timeout=180)
+        elif self.provider == "ollama":
+            payload = self._ollama_payload(prompt, stream=False, fmt=fmt)
+            r = self.session.post(self.ollama_generate_url, json=payload, timeout=self.timeout)
             if r.status_code != 200:
-                raise RuntimeError(f"Ollama error {r.status_code}: {r.text}")
+                raise _ollama_error(r)
             data = r.json()
-            return (data.get("response") or "").strip()
+            text = (data.get("response") or "").strip()
+
+        else:
+            raise RuntimeError(f"Unknown provider: {self.provider!r}")
+
+        self.last_call = {"cached": False, "streamed": False, "total_s": time.perf_counter() - started}
+        return text
+
+    def _iter_chunks(self, prompt: str, fmt: Any = None) -> Iterator[str]:
+        """
+        Yield generated text as it arrives. Closing the generator closes the
+        underlying stream, which makes Ollama stop generating.
+        """
+        if self.provider == "gemini":
+            stream = self.model.generate_content(
+                prompt,
+                generation_config=self._gemini_generation_config(fmt),
+                stream=True,
+            )
+            for chunk in stream:
+                try:
+                    yield chunk.text or ""
+                except ValueError:
+                    # Chunk without text parts (e.g. only a finish reason / safety block)
+                    continue
+            return
+
+        if self.provider == "ollama":
+            payload = self._ollama_payload(prompt, stream=True, fmt=fmt)
+            with self.session.post(self.ollama_generate_url, json=payload, timeout=self.timeout, stream=True) as r:
+                if r.status_code != 200:
+                    raise _ollama_error(r)
+                for line in r.iter_lines():
+                    if not line:
+                        continue
+                    data = json.loads(line)
+                    if data.get("error"):
+                        raise RuntimeError(f"Ollama error: {data['error']}")
+                    yield data.get("response") or ""
+                    if data.get("done"):
+                        return
+            return
 
         raise RuntimeError(f"Unknown provider: {self.provider!r}")
 
-    def _generate_json(self, prompt: str) -> Dict[str, Any]:
+    def _call_model_streaming(
+        self, prompt: str, json_mode: bool, fmt: Any = None, cancel: Optional[threading.Event] = None
+    ) -> str:
+        started = time.perf_counter()
+        first_token_at = None
+        parts = []
+        tokens = 0
+        stop_reason = "done"
+        # JSON requests always want an object, so "[...]" in a preamble must not end the stream
+        tracker = JsonStreamTracker(expect="{") if json_mode else None
+
+        chunks = self._iter_chunks(prompt, fmt)
+        try:
+            for chunk in chunks:
+                if cancel is not None and cancel.is_set():
+                    stop_reason = "cancelled"
+                    break
+                if not chunk:
+                    continue
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+
+                # Ollama streams about one token per chunk; Gemini chunks are larger
+                tokens += 1 if self.provider == "ollama" else max(1, len(chunk) // 4)
+
+                end = tracker.feed(chunk) if tracker is not None else None
+                if end is not None:
+                    parts.append(chunk[:end])
+                    stop_reason = "json_complete"
+                    break
+                parts.append(chunk)
+                if tokens >= self.max_output_tokens:
+                    stop_reason = "max_tokens"
+                    break
+        finally:
+            chunks.close()
+
+        finished = time.perf_counter()
+        self.last_call = {
+            "cached": False,
+            "streamed": True,
+            "ttft_s": (first_token_at - started) if first_token_at is not None else None,
+            "total_s": finished - started,
+            "tokens": tokens,
+            "stop_reason": stop_reason,
+        }
+        return "".join(parts).strip()
+
+    def _generate_json(self, prompt: str, schema: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
             def _strip_to_json(s: str) -> str:
                 """
                 Make best effort to extract valid JSON text from model output.
@@ -133,26 +527,44 @@ class BaseAgent:
 
                 return s
 
-            text = self._generate_text(prompt)
+            text = self._generate_text(prompt, json_mode=True, schema=schema)
             cleaned = _strip_to_json(text)
 
+            # Agents expect an object; a bare list or string counts as a parse failure
             try:
-                return json.loads(cleaned)
+                result = json.loads(cleaned)
+                if isinstance(result, dict):
+                    JSON_STATS.record("direct")
+                    return result
             except json.JSONDecodeError:
-                # One corrective retry
-                fix_prompt = (
-                    "Return ONLY valid JSON (no markdown, no code fences, no extra text). "
-                    "Fix the following into valid JSON:\n\n" + (text or "")
-                )
-                text2 = self._generate_text(fix_prompt)
-                cleaned2 = _strip_to_json(text2)
-
-                try:
-                    return json.loads(cleaned2)
-                except json.JSONDecodeError as e:
-                    snippet = (cleaned2 or text2 or "").strip()
-                    raise ValueError(f"Failed to parse JSON output. Snippet: {snippet[:200]}") from e
+                pass
+
+            # Local repair first: trailing commas, stray quotes, truncation, ...
+            result = _lenient_object(text)
+            if result is not None:
+                JSON_STATS.record("local_repair")
+                return result
+
+            # One corrective retry
+            fix_prompt = (
+                "Return ONLY valid JSON (no markdown, no code fences, no extra text). "
+                "Fix the following into valid JSON:\n\n" + (text or "")
+            )
+            text2 = self._generate_text(fix_prompt, json_mode=True, schema=schema)
+            cleaned2 = _strip_to_json(text2)
 
+            try:
+                result = json.loads(cleaned2)
+            except json.JSONDecodeError:
+                result = None
+            if not isinstance(result, dict):
+                result = _lenient_object(text2)
+            if result is None:
+                JSON_STATS.record("failed")
+                snippet = (cleaned2 or text2 or "").strip()
+                raise ValueError(f"Failed to parse a JSON object from the output. Snippet: {snippet[:200]}")
+            JSON_STATS.record("llm_repair")
+            return result
 
 if __name__ == "__main__":
     agent = BaseAgent(system_instruction="You are a concise assistant.")
@@ -1,7 +1,22 @@
 import json
-from typing import Dict, Any
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Any, List, Optional, Tuple
 
-from app.agents.base_agent import BaseAgent
+from app.agents.base_agent import BaseAgent, json_schema_for
+from app.agents.prompt_budget import (
+    PromptPlan,
+    estimate_tokens,
+    plan_sections,
+    section_base,
+    section_rank,
+    split_into_windows,
+)
+from app.config import (
+    EXTRACTION_CHUNKED,
+    EXTRACTION_MAP_WORKERS,
+    EXTRACTION_TOKEN_BUDGET,
+    EXTRACTION_WINDOW_OVERLAP_TOKENS,
+)
 
 
 EXTRACTION_SCHEMA = {
@@ -13,6 +28,28 @@ EXTRACTION_SCHEMA = {
     "limitations": "What limitations or failure cases are mentioned?"
 }
 
+# Constrained-output schema: like EXTRACTION_SCHEMA, with the list fields as arrays
+EXTRACTION_JSON_SCHEMA = json_schema_for(
+    {k: (["str"] if k in ("datasets", "metrics") else v) for k, v in EXTRACTION_SCHEMA.items()}
+)
+
+# Estimated tokens for each section's "## NAME" heading and spacing
+SECTION_HEADING_TOKENS = 6
+
+# "auto" chunking only kicks in when a section at least this valuable
+# (abstract, method, experiments/results; see prompt_budget.SECTION_RANKS)
+# would be truncated or dropped from the budgeted prompt
+CHUNK_TRIGGER_RANK = 2
+
+# Text the splitter couldn't put under a heading; it may hold any of the key
+# sections, so cutting it also triggers "auto" chunking
+UNSPLIT_SECTIONS = ("full_text", "front_matter")
+
+# Fields merged as lists in chunked extraction; the rest are single values
+LIST_FIELDS = ("datasets", "metrics")
+
+_MISSING_VALUES = {"", "not specified", "n/a", "none", "unknown", "not mentioned"}
+
 
 class ExtractionAgent(BaseAgent):
     """
@@ -30,18 +67,8 @@ class ExtractionAgent(BaseAgent):
             )
         )
 
-    def build_prompt(self, paper_json: Dict[str, Any]) -> str:
-        """
-        Build the extraction prompt given a processed paper JSON.
-        """
-        sections = paper_json.get("sections", {})
-
-        sections_text = ""
-        for name, content in sections.items():
-            sections_text += f"\n\n## {name.upper()}\n{content}\n"
-
+    def _render_prompt(self, sections_text: str) -> str:
         schema_description = json.dumps(EXTRACTION_SCHEMA, indent=2)
-
         prompt = f"""
 You are given sections from a research paper.
 
@@ -59,13 +86,189 @@ PAPER SECTIONS:
 """
         return prompt.strip()
 
-    def extract(self, paper_json: Dict[str, Any]) -> Dict[str, Any]:
+    @staticmethod
+    def _format_sections(sections: List[Tuple[str, str]]) -> str:
+        sections_text = ""
+        for name, content in sections:
+            sections_text += f"\n\n## {name.upper()}\n{content}\n"
+        return sections_text
+
+    def _plan(self, paper_json: Dict[str, Any], token_budget: int) -> PromptPlan:
+        instructions_tokens = estimate_tokens(self._render_prompt(""))
+        return plan_sections(
+            paper_json.get("sections", {}),
+            budget_tokens=max(0, token_budget - instructions_tokens),
+            section_overhead_tokens=SECTION_HEADING_TOKENS,
+        )
+
+    def _cuts_key_sections(self, paper_json: Dict[str, Any]) -> bool:
+        plan = self._plan(paper_json, EXTRACTION_TOKEN_BUDGET)
+        return any(
+            section_rank(name) <= CHUNK_TRIGGER_RANK or section_base(name) in UNSPLIT_SECTIONS
+            for name in plan.truncated + plan.dropped
+        )
+
+    def build_prompt(self, paper_json: Dict[str, Any], token_budget: int = EXTRACTION_TOKEN_BUDGET) -> str:
+        """
+        Build the extraction prompt given a processed paper JSON.
+
+        Sections are chosen by value for the schema (see prompt_budget) so the
+        whole prompt stays within `token_budget` estimated tokens.
+        """
+        plan = self._plan(paper_json, token_budget)
+        prompt = self._render_prompt(self._format_sections(plan.sections))
+        label = paper_json.get("arxiv_id") or paper_json.get("paper_id") or "paper"
+        print(f"[extract] Prompt for {label}: ~{estimate_tokens(prompt)}/{token_budget} tokens ({plan.describe()})")
+        return prompt
+
+    def build_window_prompts(
+        self,
+        paper_json: Dict[str, Any],
+        token_budget: int = EXTRACTION_TOKEN_BUDGET,
+        overlap_tokens: int = EXTRACTION_WINDOW_OVERLAP_TOKENS,
+    ) -> List[str]:
+        """
+        One extraction prompt per overlapping window of the full paper text,
+        each within `token_budget` estimated tokens.
+        """
+        instructions_tokens = estimate_tokens(self._render_prompt(""))
+        windows = split_into_windows(
+            paper_json.get("sections", {}),
+            window_tokens=max(1, token_budget - instructions_tokens),
+            overlap_tokens=overlap_tokens,
+            section_overhead_tokens=SECTION_HEADING_TOKENS,
+        )
+        return [self._render_prompt(self._format_sections(window)) for window in windows]
+
+    def extract(self, paper_json: Dict[str, Any], chunked: Optional[str] = None) -> Dict[str, Any]:
         """
         Run extraction on a single paper.
+
+        `chunked` (default EXTRACTION_CHUNKED) picks the mode: "off" always
+        sends the single budgeted prompt, "always" forces map-reduce
+        extraction, and "auto" uses map-reduce only when the budgeted prompt
+        would truncate or drop a high-value section (abstract, method,
+        experiments/results – rank <= CHUNK_TRIGGER_RANK) or text without a
+        heading (full_text, front_matter), which may hold them. Losing related
+        work, background or repeated sections like results_2 is left to the
+        ranked budget, so most papers still take one call.
         """
+        mode = (chunked or EXTRACTION_CHUNKED).strip().lower()
+        if mode == "always" or (mode == "auto" and self._cuts_key_sections(paper_json)):
+            prompts = self.build_window_prompts(paper_json)
+            if len(prompts) > 1:
+                return self.extract_chunked(paper_json, prompts)
+
         prompt = self.build_prompt(paper_json)
-        return self._generate_json(prompt)
+        return self._generate_json(prompt, schema=EXTRACTION_JSON_SCHEMA)
+
+    def extract_chunked(
+        self,
+        paper_json: Dict[str, Any],
+        prompts: Optional[List[str]] = None,
+        workers: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        Map-reduce extraction: extract partial fields from every window
+        concurrently (up to `workers`, default EXTRACTION_MAP_WORKERS), then
+        merge them locally with merge_extractions. Windows that fail are
+        skipped; the paper fails only if every window does.
+        """
+        prompts = prompts if prompts is not None else self.build_window_prompts(paper_json)
+        label = paper_json.get("arxiv_id") or paper_json.get("paper_id") or "paper"
+        workers = max(1, min(workers or EXTRACTION_MAP_WORKERS, len(prompts)))
+        print(f"[extract] Chunked extraction for {label}: {len(prompts)} windows, {workers} at a time")
+
+        partials: List[Optional[Dict[str, Any]]] = [None] * len(prompts)
+        errors: List[Exception] = []
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(self._generate_json, prompt, EXTRACTION_JSON_SCHEMA): i for i, prompt in enumerate(prompts)}
+            for fut in as_completed(futures):
+                try:
+                    partials[futures[fut]] = fut.result()
+                except Exception as e:
+                    print(f"[extract] Window {futures[fut] + 1}/{len(prompts)} of {label} failed: {e}")
+                    errors.append(e)
+
+        if len(errors) == len(prompts):
+            raise errors[0]
+        return merge_extractions([p for p in partials if isinstance(p, dict)])
+
+
+def _is_missing(value: Any) -> bool:
+    if value is None:
+        return True
+    if isinstance(value, str):
+        return value.strip().lower() in _MISSING_VALUES
+    if isinstance(value, (list, dict)):
+        return not value
+    return False
+
+
+def _as_list(value: Any) -> List[str]:
+    if isinstance(value, list):
+        items = value
+    elif isinstance(value, str):
+        items = value.split(",") if "," in value and "\n" not in value else [value]
+    elif value is None:
+        items = []
+    else:
+        items = [value]
+    out = []
+    for item in items:
+        text = item if isinstance(item, str) else json.dumps(item)
+        text = text.strip()
+        if not _is_missing(text):
+            out.append(text)
+    return out
+
+
+def _as_text(value: Any) -> str:
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, list):
+        return "; ".join(_as_text(v) for v in value if not _is_missing(v))
+    return json.dumps(value)
+
+
+def merge_extractions(partials: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Deterministic reduce step for chunked extraction (no LLM call).
+
+    List fields (datasets, metrics) are the union over windows, de-duplicated
+    case-insensitively in first-seen order. Every other field takes the value
+    reported by the most windows (compared case- and whitespace-insensitively),
+    ties going to the earliest window; "Not specified" only wins when no
+    window found anything.
+    """
+    merged: Dict[str, Any] = {}
+    for field in EXTRACTION_SCHEMA:
+        values = [p.get(field) for p in partials if not _is_missing(p.get(field))]
+
+        if field in LIST_FIELDS:
+            seen = set()
+            items = []
+            for value in values:
+                for item in _as_list(value):
+                    norm = " ".join(item.lower().split())
+                    if norm not in seen:
+                        seen.add(norm)
+                        items.append(item)
+            merged[field] = items if items else "Not specified"
+            continue
 
+        support: Dict[str, int] = {}
+        first: Dict[str, str] = {}
+        for value in values:
+            text = _as_text(value)
+            norm = " ".join(text.lower().split())
+            if not norm:
+                continue
+            support[norm] = support.get(norm, 0) + 1
+            first.setdefault(norm, text)
+        # dicts keep insertion order, so max() breaks ties by the earliest window
+        merged[field] = first[max(support, key=support.get)] if support else "Not specified"
+    return merged
 
 if __name__ == "__main__":
     # Simple smoke test with a dummy paper
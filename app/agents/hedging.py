@@ -0,0 +1,127 @@
+"""
+Hedged LLM requests: latency tracking and win statistics.
+
+When hedging is on (LLM_HEDGE_PROVIDER), an agent whose call hasn't finished
+after the primary model's observed p95 latency sends the same request to the
+secondary provider/model and takes whichever answer arrives first (see
+BaseAgent._call_hedged). A primary call that fails before then fails over to
+the secondary straight away.
+
+LatencyTracker keeps a rolling window of completed call times per
+provider/model; HEDGE_STATS counts how often a hedge was sent and which
+side won, so the percentile and the initial delay can be tuned. It also
+tracks cancelled losers and how long each kept its provider slot after
+being cancelled (hedged calls always stream so this stays short).
+"""
+
+import threading
+from collections import deque
+from typing import Deque, Dict
+
+from app.config import (
+    LLM_HEDGE_INITIAL_DELAY_S,
+    LLM_HEDGE_MIN_SAMPLES,
+    LLM_HEDGE_PERCENTILE,
+    LLM_HEDGE_WINDOW,
+)
+
+
+class LatencyTracker:
+    """Rolling window of completed call latencies for one provider/model."""
+
+    def __init__(self, window: int = LLM_HEDGE_WINDOW):
+        self._samples: Deque[float] = deque(maxlen=max(1, window))
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, q: float) -> float:
+        """Nearest-rank percentile of the window (0.0 when empty)."""
+        with self._lock:
+            values = sorted(self._samples)
+        if not values:
+            return 0.0
+        rank = max(1, int(round(q / 100 * len(values))))
+        return values[min(rank, len(values)) - 1]
+
+    def hedge_delay(
+        self,
+        q: float = LLM_HEDGE_PERCENTILE,
+        min_samples: int = LLM_HEDGE_MIN_SAMPLES,
+        initial: float = LLM_HEDGE_INITIAL_DELAY_S,
+    ) -> float:
+        """Seconds to wait before hedging: the q-th percentile once enough calls were seen."""
+        with self._lock:
+            enough = len(self._samples) >= min_samples
+        return self.percentile(q) if enough else initial
+
+
+_trackers: Dict[str, LatencyTracker] = {}
+_trackers_lock = threading.Lock()
+
+
+def get_latency_tracker(provider: str, model: str) -> LatencyTracker:
+    key = f"{provider}:{model}"
+    with _trackers_lock:
+        tracker = _trackers.get(key)
+        if tracker is None:
+            tracker = LatencyTracker()
+            _trackers[key] = tracker
+        return tracker
+
+
+class HedgeStats:
+    """Thread-safe counts of hedged calls and which provider/model answered."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.hedged = 0
+        self.failovers = 0
+        self.wins: Dict[str, int] = {}
+        self.cancelled = 0
+        self.released = 0
+        self.release_s = 0.0
+        self.release_max_s = 0.0
+
+    def record(self, winner: str, hedged: bool, failover: bool = False):
+        with self._lock:
+            self.calls += 1
+            self.hedged += int(hedged)
+            self.failovers += int(failover)
+            self.wins[winner] = self.wins.get(winner, 0) + 1
+
+    def record_cancel(self):
+        """A losing call was told to stop."""
+        with self._lock:
+            self.cancelled += 1
+
+    def record_release(self, seconds: float):
+        """A cancelled call gave its provider slot back `seconds` after being cancelled."""
+        with self._lock:
+            self.released += 1
+            self.release_s += seconds
+            self.release_max_s = max(self.release_max_s, seconds)
+
+    def describe(self) -> str:
+        with self._lock:
+            if not self.calls:
+                return "no hedged-mode calls"
+            wins = ", ".join(f"{name} {n}" for name, n in sorted(self.wins.items()))
+            text = (
+                f"{self.calls} calls, {self.hedged} hedged ({self.hedged / self.calls:.1%}), "
+                f"{self.failovers} failovers; wins: {wins}"
+            )
+            if self.cancelled:
+                avg = self.release_s / self.released if self.released else 0.0
+                text += (
+                    f"; {self.cancelled} losers cancelled, {self.released} slots released "
+                    f"(avg {avg:.1f}s, max {self.release_max_s:.1f}s after cancel), "
+                    f"{self.cancelled - self.released} still held"
+                )
+            return text
+
+
+HEDGE_STATS = HedgeStats()
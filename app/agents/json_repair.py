@@ -0,0 +1,236 @@
+"""
+Local repair of almost-JSON model output.
+
+repair_json rewrites the usual ways a model breaks JSON into valid JSON text
+in one pass, so _generate_json doesn't need a second LLM call to fix syntax:
+
+- markdown fences and commentary before the first "{" / "[" or after the
+  value closes
+- trailing and doubled commas, // and /* */ comments
+- single-quoted strings, unquoted keys, Python True/False/None, NaN
+- unescaped quotes, raw newlines/tabs and invalid escapes inside strings
+- mismatched closers and output truncated mid-value (open strings, keys
+  and containers are closed)
+
+An inner quote counts as the end of the string only when the next
+non-blank character could follow a string ("," ":" "}" "]" or the end), so
+`"said "hi" twice"` becomes `"said \\"hi\\" twice"`.
+
+JSON_STATS counts how each JSON response was parsed (directly, after local
+repair, after a corrective LLM call, or not at all) across all agents.
+"""
+
+import json
+import re
+import threading
+from typing import Any, Dict, List, Optional
+
+_OPENERS = {"{": "}", "[": "]"}
+_VALID_ESCAPES = set('"\\/bfnrtu')
+_CONTROL_ESCAPES = {"\n": "\\n", "\r": "\\r", "\t": "\\t", "\b": "\\b", "\f": "\\f"}
+_WORD_RE = re.compile(r"[A-Za-z0-9_.+\-]+")
+_NUMBER_RE = re.compile(r"-?(0|[1-9]\d*)(\.\d+)?([eE][+-]?\d+)?$")
+_LITERALS = {
+    "true": "true", "false": "false", "null": "null",
+    "True": "true", "False": "false", "None": "null",
+    "NaN": "null", "Infinity": "null", "-Infinity": "null",
+}
+
+
+def _strip_fences(text: str) -> str:
+    s = text.strip()
+    if s.startswith("```"):
+        lines = s.splitlines()[1:]
+        if lines and lines[-1].strip().startswith("```"):
+            lines = lines[:-1]
+        s = "\n".join(lines)
+    return s
+
+
+def _next_significant(text: str, i: int) -> str:
+    while i < len(text) and text[i] in " \t\r\n":
+        i += 1
+    return text[i] if i < len(text) else ""
+
+
+def _trim_trailing_comma(out: List[str]):
+    while out and out[-1].isspace():
+        out.pop()
+    if out and out[-1] == ",":
+        out.pop()
+
+
+def repair_json(text: str, expect: Optional[str] = None) -> str:
+    """
+    Best-effort rewrite of `text` into valid JSON text (see module docstring).
+    The result may still fail to parse when the input is too far gone.
+    With expect="{" the value starts at the first "{", skipping any "[...]"
+    before it.
+    """
+    s = _strip_fences(text or "")
+    openers = (expect,) if expect else tuple(_OPENERS)
+    starts = [i for i in (s.find(c) for c in openers) if i != -1]
+    if not starts:
+        return s.strip()
+    s = s[min(starts):]
+
+    out: List[str] = []
+    stack: List[str] = []   # expected closers
+    key_pos: List[bool] = []  # per container: next string in an object is a key
+    pending_key = False     # a key was written but no ":" yet
+    i, n = 0, len(s)
+
+    while i < n:
+        ch = s[i]
+
+        if ch in "\"'":
+            # String: copy until its closing quote, fixing contents on the way
+            quote = ch
+            i += 1
+            out.append('"')
+            closed = False
+            while i < n:
+                c = s[i]
+                if c == "\\":
+                    nxt = s[i + 1] if i + 1 < n else ""
+                    if nxt in _VALID_ESCAPES:
+                        out.append(c + nxt)
+                    elif nxt == "'":
+                        out.append("'")
+                    else:
+                        out.append("\\\\" + nxt)
+                    i += 2
+                    continue
+                if c == quote and _next_significant(s, i + 1) in (",", ":", "}", "]", ""):
+                    closed = True
+                    i += 1
+                    break
+                if c == '"':
+                    out.append('\\"')
+                elif c in _CONTROL_ESCAPES:
+                    out.append(_CONTROL_ESCAPES[c])
+                elif ord(c) < 0x20:
+                    out.append("\\u%04x" % ord(c))
+                else:
+                    out.append(c)
+                i += 1
+            out.append('"')
+            if stack and stack[-1] == "}" and key_pos[-1]:
+                pending_key = True
+                key_pos[-1] = False
+            if not closed:
+                break
+            continue
+
+        if ch in _OPENERS:
+            stack.append(_OPENERS[ch])
+            key_pos.append(ch == "{")
+            pending_key = False
+            out.append(ch)
+        elif ch in "}]":
+            if ch in stack:
+                _trim_trailing_comma(out)
+                if pending_key:
+                    out.append(": null")
+                    pending_key = False
+                # Close anything left open inside the container being closed
+                while stack[-1] != ch:
+                    out.append(stack.pop())
+                    key_pos.pop()
+                out.append(stack.pop())
+                key_pos.pop()
+                if not stack:
+                    break
+            # else: stray closer, drop it
+        elif ch == ",":
+            _trim_trailing_comma(out)
+            if pending_key:
+                out.append(": null")
+                pending_key = False
+            if out and out[-1] not in ("{", "["):
+                out.append(",")
+            if stack and stack[-1] == "}":
+                key_pos[-1] = True
+        elif ch == ":":
+            out.append(":")
+            pending_key = False
+        elif ch == "#" or s.startswith("//", i):
+            end = s.find("\n", i)
+            i = n if end == -1 else end
+            continue
+        elif s.startswith("/*", i):
+            end = s.find("*/", i + 2)
+            i = n if end == -1 else end + 2
+            continue
+        elif ch.isspace():
+            out.append(ch)
+        else:
+            m = _WORD_RE.match(s, i)
+            if not m:
+                i += 1  # stray punctuation
+                continue
+            word = m.group(0)
+            i = m.end()
+            if word in _LITERALS:
+                out.append(_LITERALS[word])
+            elif _NUMBER_RE.match(word):
+                out.append(word)
+            else:
+                # Unquoted key or bare word value
+                out.append(json.dumps(word))
+                if stack and stack[-1] == "}" and key_pos[-1]:
+                    pending_key = True
+                    key_pos[-1] = False
+            continue
+        i += 1
+
+    # Truncated output: drop a dangling separator, complete the last member, close containers
+    if stack:
+        _trim_trailing_comma(out)
+        while out and out[-1].isspace():
+            out.pop()
+        if out and out[-1] == ":":
+            out.append(" null")
+        elif pending_key:
+            out.append(": null")
+        while stack:
+            out.append(stack.pop())
+
+    return "".join(out).strip()
+
+
+def loads_lenient(text: str, expect: Optional[str] = None) -> Any:
+    """json.loads after repair_json; raises json.JSONDecodeError when even that fails."""
+    return json.loads(repair_json(text, expect))
+
+
+class JsonParseStats:
+    """Thread-safe counts of how JSON responses were parsed."""
+
+    OUTCOMES = ("direct", "local_repair", "llm_repair", "failed")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {k: 0 for k in self.OUTCOMES}
+
+    def record(self, outcome: str):
+        with self._lock:
+            self._counts[outcome] += 1
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counts)
+
+    def describe(self) -> str:
+        counts = self.snapshot()
+        total = sum(counts.values())
+        if not total:
+            return "no JSON responses"
+        return (
+            f"{total} JSON responses: {counts['direct']} parsed, {counts['local_repair']} repaired locally, "
+            f"{counts['llm_repair']} needed an LLM repair call ({counts['llm_repair'] / total:.1%}), "
+            f"{counts['failed']} failed"
+        )
+
+
+JSON_STATS = JsonParseStats()
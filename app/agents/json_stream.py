@@ -0,0 +1,68 @@
+"""
+Incremental JSON boundary detection for streamed model output.
+
+JsonStreamTracker is fed text chunks as they arrive and reports where the
+first top-level JSON object/array closes, so generation can be stopped there
+instead of waiting for the model to finish (or ramble on after the JSON).
+It only tracks nesting, strings and escapes – enough to find the end of a
+well-formed value, not a validator.
+
+With expect="{" only an object starts the tracked value, so a preamble such
+as "[JSON]" or a bracketed note before the answer doesn't end the stream.
+"""
+
+from typing import Optional
+
+
+class JsonStreamTracker:
+    _OPENERS = {"{": "}", "[": "]"}
+
+    def __init__(self, expect: Optional[str] = None):
+        self._starters = (expect,) if expect else tuple(self._OPENERS)
+        self.started = False
+        self.complete = False
+        self.malformed = False
+        self._stack = []
+        self._in_string = False
+        self._escaped = False
+
+    def feed(self, chunk: str) -> Optional[int]:
+        """
+        Consume the next chunk. Returns the offset just past the closing
+        bracket within this chunk once the top-level value is complete,
+        otherwise None. Text before the first "{" / "[" (or the expected
+        opener) is ignored.
+        """
+        if self.complete:
+            return 0
+
+        for i, ch in enumerate(chunk):
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+
+            if not self.started:
+                if ch in self._starters:
+                    self._stack.append(self._OPENERS[ch])
+                    self.started = True
+                continue
+
+            if ch in self._OPENERS:
+                self._stack.append(self._OPENERS[ch])
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "}]":
+                if not self._stack or self._stack[-1] != ch:
+                    # Mismatched closer: stop tracking, let the JSON parser report it
+                    self.malformed = True
+                    return None
+                self._stack.pop()
+                if not self._stack:
+                    self.complete = True
+                    return i + 1
+        return None
@@ -0,0 +1,212 @@
+"""
+Persistent LLM response cache shared by all agents.
+
+Responses are stored in SQLite (data/cache/llm_cache.db) keyed by a SHA-256
+of provider, model, system instruction, prompt and generation parameters, so
+a byte-identical request is answered from disk instead of the model, across
+runs and processes.
+
+Entries expire after LLM_CACHE_TTL_S; when the stored responses exceed
+LLM_CACHE_MAX_MB the least recently used ones are evicted. LLM_CACHE_MAX_MB=0
+disables the cache; LLM_CACHE_BYPASS=1 skips lookups but still stores fresh
+responses.
+
+    python -m app.agents.llm_cache          # stats
+    python -m app.agents.llm_cache clear    # drop every entry
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from app.config import LLM_CACHE_BYPASS, LLM_CACHE_MAX_MB, LLM_CACHE_TTL_S
+
+
+LLM_CACHE_PATH = os.path.join("data", "cache", "llm_cache.db")
+
+# Size-based eviction is checked every this many writes, and trims to this fraction of the cap
+_EVICT_EVERY = 50
+_EVICT_TO = 0.9
+
+
+def make_cache_key(
+    provider: str,
+    model: str,
+    system_instruction: str,
+    prompt: str,
+    params: Optional[Dict[str, Any]] = None,
+) -> str:
+    payload = json.dumps(
+        {
+            "provider": provider,
+            "model": model,
+            "system": system_instruction or "",
+            "prompt": prompt,
+            "params": params or {},
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    def __init__(
+        self,
+        path: str = LLM_CACHE_PATH,
+        ttl_s: float = LLM_CACHE_TTL_S,
+        max_mb: float = LLM_CACHE_MAX_MB,
+        bypass: bool = LLM_CACHE_BYPASS,
+    ):
+        self.path = path
+        self.ttl_s = ttl_s
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.bypass = bypass
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._writes_since_evict = 0
+        self.stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def _connection(self) -> sqlite3.Connection:
+        # Caller holds the lock
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    provider TEXT,
+                    model TEXT,
+                    response TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used_at REAL NOT NULL,
+                    hits INTEGER NOT NULL DEFAULT 0
+                );
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_last_used ON llm_cache(last_used_at);")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _fresh(self, created_at: float) -> bool:
+        return self.ttl_s <= 0 or (time.time() - created_at) < self.ttl_s
+
+    def get(self, key: str) -> Optional[str]:
+        """Cached response for `key`, or None on a miss / expired entry / bypass."""
+        if not self.enabled or self.bypass:
+            return None
+
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute("SELECT response, created_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row and self._fresh(row[1]):
+                conn.execute(
+                    "UPDATE llm_cache SET last_used_at = ?, hits = hits + 1 WHERE key = ?",
+                    (time.time(), key),
+                )
+                conn.commit()
+                self.stats["hits"] += 1
+                return row[0]
+            self.stats["misses"] += 1
+            return None
+
+    def put(self, key: str, response: str, provider: str = "", model: str = ""):
+        if not self.enabled:
+            return
+
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO llm_cache (key, provider, model, response, size, created_at, last_used_at, hits)
+                VALUES (?, ?, ?, ?, ?, ?, ?, 0)
+                """,
+                (key, provider, model, response, len(response.encode("utf-8")), now, now),
+            )
+            conn.commit()
+            self.stats["writes"] += 1
+            self._writes_since_evict += 1
+            if self._writes_since_evict >= _EVICT_EVERY:
+                self._evict()
+
+    def _evict(self):
+        """Drop expired entries, then least recently used ones until under the cap. Caller holds the lock."""
+        conn = self._connection()
+        self._writes_since_evict = 0
+        removed = 0
+        if self.ttl_s > 0:
+            removed += conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (time.time() - self.ttl_s,)).rowcount
+
+        total = conn.execute("SELECT coalesce(sum(size), 0) FROM llm_cache").fetchone()[0]
+        if total > self.max_bytes:
+            target = self.max_bytes * _EVICT_TO
+            doomed = []
+            for key, size in conn.execute("SELECT key, size FROM llm_cache ORDER BY last_used_at ASC"):
+                if total <= target:
+                    break
+                doomed.append((key,))
+                total -= size
+            conn.executemany("DELETE FROM llm_cache WHERE key = ?", doomed)
+            removed += len(doomed)
+
+        conn.commit()
+        self.stats["evictions"] += removed
+
+    def evict(self):
+        with self._lock:
+            self._evict()
+
+    def clear(self) -> int:
+        if not os.path.exists(self.path):
+            return 0
+        with self._lock:
+            conn = self._connection()
+            removed = conn.execute("DELETE FROM llm_cache").rowcount
+            conn.commit()
+            return removed
+
+    def summary(self) -> str:
+        with self._lock:
+            entries, size = 0, 0
+            if os.path.exists(self.path):
+                entries, size = self._connection().execute(
+                    "SELECT count(*), coalesce(sum(size), 0) FROM llm_cache"
+                ).fetchone()
+            mb = 1024 * 1024
+            return (
+                f"hits={self.stats['hits']}, misses={self.stats['misses']}, writes={self.stats['writes']}, "
+                f"evictions={self.stats['evictions']}, entries={entries}, "
+                f"size={size / mb:.1f}/{self.max_bytes / mb:.0f} MB"
+                + (", bypass" if self.bypass else "")
+            )
+
+
+_default_cache: Optional[LLMResponseCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> LLMResponseCache:
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = LLMResponseCache()
+        return _default_cache
+
+
+if __name__ == "__main__":
+    cache = get_llm_cache()
+    if len(sys.argv) >= 2 and sys.argv[1] == "clear":
+        print(f"[llm-cache] Removed {cache.clear()} entries")
+    print(f"[llm-cache] {cache.summary()}")
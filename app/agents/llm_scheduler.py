@@ -0,0 +1,239 @@
+"""
+Rate-limit-aware scheduling of LLM calls.
+
+Every model call made by an agent goes through its provider's
+ProviderScheduler, shared by all agents in the process:
+
+- at most `max_concurrency` calls to the provider are in flight;
+- calls draw from a requests-per-minute token bucket (rpm=0: unlimited);
+- retryable failures (HTTP 429/5xx, Gemini ResourceExhausted /
+  ServiceUnavailable, timeouts, dropped connections) are retried with
+  exponential backoff and full jitter, waiting outside the concurrency slot
+  so healthy calls keep going;
+- a Retry-After (header, or the retry delay in a Gemini error) pauses the
+  whole provider for that long, since every other call would hit it too.
+
+RetryQueue is the work-item level counterpart for batch runners: items whose
+call still failed are parked until their backoff has passed while the rest
+of the batch proceeds.
+"""
+
+import heapq
+import itertools
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Generic, Iterator, List, Optional, Tuple, TypeVar
+
+from app.config import (
+    GEMINI_MAX_CONCURRENCY,
+    GEMINI_RPM,
+    LLM_RETRY_ATTEMPTS,
+    LLM_RETRY_BASE_S,
+    LLM_RETRY_MAX_S,
+    OLLAMA_MAX_CONCURRENCY,
+    OLLAMA_RPM,
+)
+from app.rate_limit import TokenBucket
+
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+_RETRY_DELAY_RES = (
+    re.compile(r"retry_delay\s*\{\s*seconds:\s*(\d+)"),
+    re.compile(r"retry in\s+([\d.]+)\s*s", re.IGNORECASE),
+)
+
+
+class LLMCallError(RuntimeError):
+    """A failed provider call, with its HTTP status and Retry-After when known."""
+
+    def __init__(self, message: str, status: Optional[int] = None, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds from a Retry-After header (delta-seconds form; HTTP dates are ignored)."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
+
+
+def classify_error(exc: BaseException) -> Tuple[bool, Optional[int], Optional[float]]:
+    """(retryable, status, retry_after seconds) for an exception raised by a model call."""
+    if isinstance(exc, LLMCallError):
+        return exc.status in RETRYABLE_STATUS, exc.status, exc.retry_after
+
+    # requests: timeouts and dropped connections (imported lazily, like the session)
+    try:
+        import requests
+
+        if isinstance(exc, (requests.Timeout, requests.ConnectionError)):
+            return True, None, None
+    except ImportError:
+        pass
+
+    # google.api_core exceptions carry the HTTP status as an int `code`
+    status = getattr(exc, "code", None)
+    if isinstance(status, int):
+        retry_after = None
+        for pattern in _RETRY_DELAY_RES:
+            m = pattern.search(str(exc))
+            if m:
+                retry_after = float(m.group(1))
+                break
+        return status in RETRYABLE_STATUS, status, retry_after
+
+    if isinstance(exc, TimeoutError):
+        return True, None, None
+    return False, None, None
+
+
+def backoff_delay(attempt: int, base: float = LLM_RETRY_BASE_S, cap: float = LLM_RETRY_MAX_S,
+                  retry_after: Optional[float] = None) -> float:
+    """
+    Seconds to wait before retry number `attempt` (0-based): full jitter over
+    base * 2**attempt (capped), but never less than the server's Retry-After.
+    """
+    delay = random.uniform(0, min(cap, base * (2 ** attempt)))
+    if retry_after is not None:
+        delay = max(delay, retry_after + random.uniform(0, base))
+    return delay
+
+
+class ProviderScheduler:
+    def __init__(self, name: str, max_concurrency: int, rpm: float = 0, max_attempts: int = LLM_RETRY_ATTEMPTS):
+        self.name = name
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_attempts = max(1, max_attempts)
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+        # Burst of a few seconds' worth, so a fresh batch doesn't blow the minute budget up front
+        self._bucket = TokenBucket(rpm / 60.0, max(1, int(rpm // 20))) if rpm > 0 else None
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {"calls": 0, "retries": 0, "rate_limited": 0, "failed": 0}
+
+    def _count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    def pause(self, seconds: float):
+        """Hold every new call to this provider for `seconds` (e.g. after a Retry-After)."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def _wait_if_paused(self):
+        while True:
+            with self._lock:
+                wait = self._paused_until - time.monotonic()
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        """One in-flight call: waits out a pause, a concurrency slot, then a rate token."""
+        self._wait_if_paused()
+        with self._slots:
+            if self._bucket is not None:
+                self._bucket.acquire()
+            self._count("calls")
+            yield
+
+    def call(self, fn: Callable[[], Any], max_attempts: Optional[int] = None) -> Any:
+        """Run `fn` in a slot, retrying retryable failures with backoff."""
+        attempts = max(1, max_attempts or self.max_attempts)
+        for attempt in range(attempts):
+            try:
+                with self.slot():
+                    return fn()
+            except Exception as e:
+                retryable, status, retry_after = classify_error(e)
+                if status == 429:
+                    self._count("rate_limited")
+                if not retryable or attempt == attempts - 1:
+                    self._count("failed")
+                    raise
+                if retry_after is not None:
+                    self.pause(retry_after)
+                delay = backoff_delay(attempt, retry_after=retry_after)
+                self._count("retries")
+                print(f"[llm] {self.name} call failed ({e}); retry {attempt + 1}/{attempts - 1} in {delay:.1f}s")
+                time.sleep(delay)
+
+    def describe(self) -> str:
+        with self._lock:
+            s = dict(self.stats)
+        return (
+            f"{self.name}: {s['calls']} calls, {s['retries']} retries "
+            f"({s['rate_limited']} rate limited), {s['failed']} failed"
+        )
+
+
+_schedulers: Dict[str, ProviderScheduler] = {}
+_schedulers_lock = threading.Lock()
+
+_PROVIDER_LIMITS = {
+    "gemini": (GEMINI_MAX_CONCURRENCY, GEMINI_RPM),
+    "ollama": (OLLAMA_MAX_CONCURRENCY, OLLAMA_RPM),
+}
+
+
+def get_scheduler(provider: str) -> ProviderScheduler:
+    """The process-wide scheduler for `provider`, created on first use."""
+    with _schedulers_lock:
+        scheduler = _schedulers.get(provider)
+        if scheduler is None:
+            max_concurrency, rpm = _PROVIDER_LIMITS.get(provider, (4, 0))
+            scheduler = ProviderScheduler(provider, max_concurrency, rpm)
+            _schedulers[provider] = scheduler
+        return scheduler
+
+
+T = TypeVar("T")
+
+
+class RetryQueue(Generic[T]):
+    """
+    Work items waiting for another attempt, ordered by when they are due.
+    Not thread-safe: owned by the batch runner's dispatch loop.
+    """
+
+    def __init__(self, max_attempts: int):
+        self.max_attempts = max(1, max_attempts)
+        self._heap: List[Tuple[float, int, T, int]] = []
+        self._seq = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def schedule(self, item: T, attempts: int, exc: BaseException) -> Optional[float]:
+        """
+        Park `item` (which has failed `attempts` times with `exc`) for a retry.
+        Returns the delay in seconds, or None if it shouldn't be retried.
+        """
+        retryable, _, retry_after = classify_error(exc)
+        if not retryable or attempts >= self.max_attempts:
+            return None
+        delay = backoff_delay(attempts - 1, retry_after=retry_after)
+        heapq.heappush(self._heap, (time.monotonic() + delay, next(self._seq), item, attempts))
+        return delay
+
+    def pop_ready(self) -> Optional[Tuple[T, int]]:
+        """(item, attempts so far) for the next due item, or None."""
+        if self._heap and self._heap[0][0] <= time.monotonic():
+            _, _, item, attempts = heapq.heappop(self._heap)
+            return item, attempts
+        return None
+
+    def next_due_in(self) -> Optional[float]:
+        """Seconds until the next item is due (0 if one is), None when empty."""
+        if not self._heap:
+            return None
+        return max(0.0, self._heap[0][0] - time.monotonic())
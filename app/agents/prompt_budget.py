@@ -0,0 +1,203 @@
+"""
+Token-budgeted selection of paper sections for prompts.
+
+Sections are ranked by how much they contribute to the extraction schema
+(abstract, method, experiments/results, limitations first; related work and
+background last), then packed into a token budget: whole sections while
+they fit, the head of the next one if enough room is left, the rest dropped.
+The chosen sections keep their original document order.
+
+For papers that don't fit, split_into_windows cuts the whole text into
+overlapping windows of the same size instead, for chunked (map-reduce)
+extraction.
+
+Token counts are estimates (about 4 characters per token), which is close
+enough for budgeting across both Gemini and local models.
+"""
+
+import math
+import re
+from typing import Dict, List, Optional, Tuple
+
+CHARS_PER_TOKEN = 4
+
+# Lower rank = more valuable. Keys are splitter section names (see section_splitter).
+SECTION_RANKS: Dict[str, int] = {
+    "abstract": 0,        # task, method, headline results
+    "method": 1,          # method
+    "methodology": 1,
+    "approach": 1,
+    "experiments": 2,     # datasets, metrics
+    "results": 2,         # key_results
+    "limitations": 3,     # limitations
+    "conclusion": 4,      # results + limitations summary
+    "introduction": 5,    # task
+    "analysis": 6,
+    "discussion": 6,
+    "future work": 7,
+    "front_matter": 8,
+    "full_text": 8,       # no headings found: whatever fits
+    "background": 9,
+    "related work": 10,
+}
+_DEFAULT_RANK = 8
+
+# A repeated header ("results_2") ranks below every first occurrence of its kind
+_REPEAT_PENALTY = 3
+
+# Don't bother including the head of a section with less room than this
+MIN_PARTIAL_TOKENS = 150
+
+_SUFFIX_RE = re.compile(r"_(\d+)$")
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN) if text else 0
+
+
+def section_base(name: str) -> str:
+    """Section name without its repeat suffix ("results_2" -> "results")."""
+    m = _SUFFIX_RE.search(name)
+    return name[:m.start()] if m else name
+
+
+def section_rank(name: str) -> int:
+    base = section_base(name)
+    rank = SECTION_RANKS.get(base, _DEFAULT_RANK)
+    return rank + _REPEAT_PENALTY if base != name else rank
+
+
+def _truncate(text: str, max_tokens: int) -> str:
+    """Head of `text` within max_tokens, cut at a paragraph or sentence end when possible."""
+    limit = max_tokens * CHARS_PER_TOKEN
+    head = text[:limit]
+    for sep in ("\n\n", ". ", "\n"):
+        cut = head.rfind(sep)
+        if cut >= limit // 2:
+            return head[:cut + len(sep)].rstrip()
+    return head.rstrip()
+
+
+class PromptPlan:
+    def __init__(self):
+        self.sections: List[Tuple[str, str]] = []
+        self.truncated: List[str] = []
+        self.dropped: List[str] = []
+        self.section_tokens = 0
+
+    def describe(self) -> str:
+        parts = [f"{len(self.sections)} sections, ~{self.section_tokens} tokens of paper text"]
+        if self.truncated:
+            parts.append(f"truncated: {', '.join(self.truncated)}")
+        if self.dropped:
+            parts.append(f"dropped: {', '.join(self.dropped)}")
+        return "; ".join(parts)
+
+
+def plan_sections(
+    sections: Dict[str, str],
+    budget_tokens: int,
+    section_overhead_tokens: int = 0,
+    min_partial_tokens: int = MIN_PARTIAL_TOKENS,
+    ranks: Optional[Dict[str, int]] = None,
+) -> PromptPlan:
+    """
+    Choose which sections (or section heads) go into a prompt with room for
+    `budget_tokens` of section text. `section_overhead_tokens` is charged per
+    included section for its heading/formatting.
+    """
+    rank_of = (lambda n: ranks.get(n, _DEFAULT_RANK)) if ranks else section_rank
+    ordered = list(sections.items())
+    by_value = sorted(range(len(ordered)), key=lambda i: (rank_of(ordered[i][0]), i))
+
+    remaining = budget_tokens
+    chosen: Dict[int, str] = {}
+    plan = PromptPlan()
+    for i in by_value:
+        name, content = ordered[i]
+        content = (content or "").strip()
+        if not content:
+            continue
+        cost = estimate_tokens(content) + section_overhead_tokens
+        if cost <= remaining:
+            chosen[i] = content
+            remaining -= cost
+        elif remaining - section_overhead_tokens >= min_partial_tokens:
+            chosen[i] = _truncate(content, remaining - section_overhead_tokens)
+            remaining -= estimate_tokens(chosen[i]) + section_overhead_tokens
+            plan.truncated.append(name)
+        else:
+            plan.dropped.append(name)
+
+    plan.sections = [(ordered[i][0], chosen[i]) for i in sorted(chosen)]
+    plan.section_tokens = sum(estimate_tokens(text) for _, text in plan.sections)
+    return plan
+
+
+def split_into_windows(
+    sections: Dict[str, str],
+    window_tokens: int,
+    overlap_tokens: int = 0,
+    section_overhead_tokens: int = 0,
+) -> List[List[Tuple[str, str]]]:
+    """
+    Cut the full paper (every section, in document order) into windows of at
+    most `window_tokens` estimated tokens, each a list of (section_name, text)
+    like PromptPlan.sections. Windows break at line boundaries, and each one
+    starts with the last `overlap_tokens` of the previous window so facts
+    that straddle a boundary are seen whole at least once.
+    """
+    limit = max(1, window_tokens) * CHARS_PER_TOKEN
+    overlap = max(0, min(overlap_tokens, window_tokens // 2)) * CHARS_PER_TOKEN
+    heading = section_overhead_tokens * CHARS_PER_TOKEN
+
+    # (section, line) units; over-long lines are hard-split so each fits a window
+    units: List[Tuple[str, str]] = []
+    for name, content in sections.items():
+        for line in (content or "").strip().splitlines():
+            step = max(1, limit - heading)
+            for start in range(0, max(len(line), 1), step):
+                units.append((name, line[start:start + step]))
+
+    windows: List[List[Tuple[str, str]]] = []
+    current: List[Tuple[str, str]] = []
+    seeded = 0  # leading units of `current` copied from the previous window
+    size = 0
+    i = 0
+    while i < len(units):
+        name, line = units[i]
+        cost = len(line) + 1 + (heading if not current or current[-1][0] != name else 0)
+        if current and size + cost > limit:
+            if len(current) == seeded:
+                # The overlap alone leaves no room for this unit: drop it
+                current, seeded, size = [], 0, 0
+                continue
+            windows.append(current)
+            # Seed the next window with the tail of this one
+            tail: List[Tuple[str, str]] = []
+            tail_size = 0
+            for unit in reversed(current):
+                if tail_size + len(unit[1]) + 1 > overlap:
+                    break
+                tail.insert(0, unit)
+                tail_size += len(unit[1]) + 1
+            current, seeded = tail, len(tail)
+            size = tail_size + (heading if tail else 0)
+            continue
+        current.append(units[i])
+        size += cost
+        i += 1
+    if len(current) > seeded:
+        windows.append(current)
+
+    # Merge consecutive lines of the same section back into section text
+    out: List[List[Tuple[str, str]]] = []
+    for window in windows:
+        merged: List[Tuple[str, str]] = []
+        for name, line in window:
+            if merged and merged[-1][0] == name:
+                merged[-1] = (name, merged[-1][1] + "\n" + line)
+            else:
+                merged.append((name, line))
+        out.append(merged)
+    return out
@@ -1,7 +1,14 @@
 import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Any, Dict, List, Optional
 
-from app.agents.base_agent import BaseAgent
+from app.agents.base_agent import BaseAgent, json_schema_for
+from app.config import (
+    SYNTHESIS_GROUP_SIZE,
+    SYNTHESIS_HIERARCHICAL,
+    SYNTHESIS_MERGE_FAN_IN,
+    SYNTHESIS_WORKERS,
+)
 
 
 SYNTHESIS_SCHEMA: Dict[str, Any] = {
@@ -47,6 +54,16 @@ SYNTHESIS_SCHEMA: Dict[str, Any] = {
     ]
 }
 
+# What the model writes at each level of hierarchical synthesis: everything
+# but paper_rollup, which is assembled locally from the inputs
+PARTIAL_SYNTHESIS_SCHEMA: Dict[str, Any] = {
+    key: value for key, value in SYNTHESIS_SCHEMA.items() if key != "paper_rollup"
+}
+
+# Constrained-output schemas for the two prompt shapes
+SYNTHESIS_JSON_SCHEMA = json_schema_for(SYNTHESIS_SCHEMA)
+PARTIAL_SYNTHESIS_JSON_SCHEMA = json_schema_for(PARTIAL_SYNTHESIS_SCHEMA)
+
 
 class SynthesisAgent(BaseAgent):
     def __init__(self):
@@ -63,21 +80,7 @@ class SynthesisAgent(BaseAgent):
     def build_prompt(self, topic: str, papers: List[Dict[str, Any]]) -> str:
         # Keep input compact but informative.
         # We include evidence snippets if available to reduce hallucinations.
-        compact = []
-        for p in papers:
-            compact.append({
-                "paper_id": p.get("paper_id"),
-                "arxiv_id": p.get("arxiv_id"),
-                "title": p.get("title"),
-                "task": p.get("task"),
-                "generation_framework": p.get("generation_framework"),
-                "evaluation_method": p.get("evaluation_method"),
-                "datasets": p.get("datasets", []),
-                "metrics": p.get("metrics", []),
-                "key_results": p.get("key_results"),
-                "limitations": p.get("limitations"),
-                "evidence": p.get("evidence", {}),
-            })
+        compact = [compact_paper(p) for p in papers]
 
         return (
             "SYNTHESIS TASK\n"
@@ -95,6 +98,168 @@ class SynthesisAgent(BaseAgent):
             "Return ONLY valid JSON."
         )
 
-    def synthesize(self, topic: str, papers: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def build_group_prompt(self, topic: str, papers: List[Dict[str, Any]]) -> str:
+        """Leaf prompt of hierarchical synthesis: one paper group, no paper_rollup."""
+        compact = [compact_paper(p) for p in papers]
+        return (
+            "SYNTHESIS TASK (one group of papers from a larger set)\n"
+            f"Topic: {topic}\n\n"
+            "You are given structured extractions for a group of papers.\n"
+            "Rules:\n"
+            "- Do NOT invent anything not present in the inputs.\n"
+            "- If a field is missing across papers, use 'Not specified'.\n"
+            "- Prefer aggregation: count repeats, group similar items, identify common patterns.\n"
+            "- Mention how many papers support each item, e.g. \"GPT-4 judge (5 papers)\".\n"
+            "- Keep lists concise and non-redundant.\n\n"
+            "Output JSON must follow this schema (keys must match):\n"
+            f"{json.dumps(PARTIAL_SYNTHESIS_SCHEMA, indent=2)}\n\n"
+            "INPUT PAPERS (JSON list):\n"
+            f"{json.dumps(compact, indent=2)}\n\n"
+            "Return ONLY valid JSON."
+        )
+
+    def build_merge_prompt(self, topic: str, partials: List[Dict[str, Any]]) -> str:
+        """Inner prompt of hierarchical synthesis: merge partial syntheses of disjoint paper groups."""
+        return (
+            "SYNTHESIS MERGE TASK\n"
+            f"Topic: {topic}\n\n"
+            "You are given partial syntheses, each covering a different group of papers.\n"
+            "Rules:\n"
+            "- Do NOT invent anything not present in the inputs.\n"
+            "- Combine items that mean the same thing and add up their paper counts.\n"
+            "- Keep a finding in consensus_findings only if the groups together support it; "
+            "move conflicting claims to notable_disagreements.\n"
+            "- If a field is missing across all inputs, use 'Not specified'.\n"
+            "- Keep lists concise and non-redundant.\n\n"
+            "Output JSON must follow this schema (keys must match):\n"
+            f"{json.dumps(PARTIAL_SYNTHESIS_SCHEMA, indent=2)}\n\n"
+            "INPUT PARTIAL SYNTHESES (JSON list):\n"
+            f"{json.dumps(partials, indent=2)}\n\n"
+            "Return ONLY valid JSON."
+        )
+
+    def synthesize(
+        self,
+        topic: str,
+        papers: List[Dict[str, Any]],
+        hierarchical: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        `hierarchical` (default SYNTHESIS_HIERARCHICAL) picks the mode: "auto"
+        uses hierarchical synthesis once there are more than
+        SYNTHESIS_GROUP_SIZE papers, "always" forces it, "off" sends every
+        paper in one prompt.
+        """
+        mode = (hierarchical or SYNTHESIS_HIERARCHICAL).strip().lower()
+        if mode == "always" or (mode == "auto" and len(papers) > SYNTHESIS_GROUP_SIZE):
+            return self.synthesize_hierarchical(topic, papers)
+
         prompt = self.build_prompt(topic, papers)
-        return self._generate_json(prompt)
\ No newline at end of file
+        return self._generate_json(prompt, schema=SYNTHESIS_JSON_SCHEMA)
+
+    def synthesize_hierarchical(
+        self,
+        topic: str,
+        papers: List[Dict[str, Any]],
+        group_size: int = SYNTHESIS_GROUP_SIZE,
+        fan_in: int = SYNTHESIS_MERGE_FAN_IN,
+        workers: int = SYNTHESIS_WORKERS,
+    ) -> Dict[str, Any]:
+        """
+        Map-reduce synthesis for topics too large for one prompt.
+
+        Papers are synthesized in groups of `group_size`, then the partial
+        syntheses are merged `fan_in` at a time, level by level, until one is
+        left: about log_fan_in(N / group_size) + 1 rounds of LLM calls. Calls
+        within a level run concurrently (up to `workers`). The model never
+        writes paper_rollup; it is built from the inputs, so it always lists
+        every paper.
+        """
+        group_size = max(1, group_size)
+        fan_in = max(2, fan_in)
+        workers = max(1, workers)
+
+        groups = [papers[i:i + group_size] for i in range(0, len(papers), group_size)]
+        print(f"[synth] Hierarchical synthesis: {len(papers)} papers in {len(groups)} groups of up to {group_size}")
+        level = self._run_level([self.build_group_prompt(topic, g) for g in groups], workers)
+
+        depth = 1
+        while len(level) > 1:
+            batches = [level[i:i + fan_in] for i in range(0, len(level), fan_in)]
+            depth += 1
+            print(f"[synth] Merge level {depth}: {len(level)} partial syntheses → {len(batches)}")
+            level = self._run_level(
+                [self.build_merge_prompt(topic, b) if len(b) > 1 else None for b in batches],
+                workers,
+                passthrough=[b[0] for b in batches],
+            )
+
+        synthesis = {"scope": {"topic": topic, "num_papers": len(papers)}}
+        for key in PARTIAL_SYNTHESIS_SCHEMA:
+            if key != "scope":
+                synthesis[key] = level[0].get(key, ["Not specified"])
+        synthesis["paper_rollup"] = [paper_rollup_entry(p) for p in papers]
+        return synthesis
+
+    def _run_level(
+        self,
+        prompts: List[Optional[str]],
+        workers: int,
+        passthrough: Optional[List[Dict[str, Any]]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Answer one level's prompts concurrently, keeping their order. A None
+        prompt (a lone partial at the end of a merge level) is carried up as is.
+        """
+        results: List[Dict[str, Any]] = [None] * len(prompts)  # type: ignore[list-item]
+        with ThreadPoolExecutor(max_workers=min(workers, len(prompts))) as pool:
+            futures = {}
+            for i, prompt in enumerate(prompts):
+                if prompt is None:
+                    results[i] = passthrough[i]
+                else:
+                    futures[pool.submit(self._generate_json, prompt, PARTIAL_SYNTHESIS_JSON_SCHEMA)] = i
+            for fut in as_completed(futures):
+                result = fut.result()
+                if not isinstance(result, dict):
+                    raise ValueError(f"Expected a JSON object from partial synthesis, got {type(result).__name__}")
+                results[futures[fut]] = result
+        return results
+
+
+def _field(p: Dict[str, Any], key: str, default: Any = None) -> Any:
+    """A paper field, falling back to its stored extraction JSON (DB rows nest it there)."""
+    value = p.get(key)
+    if value is None and isinstance(p.get("extraction_json"), dict):
+        value = p["extraction_json"].get(key)
+    return default if value is None else value
+
+
+def compact_paper(p: Dict[str, Any]) -> Dict[str, Any]:
+    """The fields of one paper that go into a synthesis prompt."""
+    return {
+        "paper_id": p.get("paper_id"),
+        "arxiv_id": p.get("arxiv_id"),
+        "title": p.get("title"),
+        "task": _field(p, "task"),
+        "generation_framework": _field(p, "generation_framework"),
+        "evaluation_method": _field(p, "evaluation_method"),
+        "datasets": _field(p, "datasets", []),
+        "metrics": _field(p, "metrics", []),
+        "key_results": _field(p, "key_results"),
+        "limitations": _field(p, "limitations"),
+        "evidence": _field(p, "evidence", {}),
+    }
+
+
+def paper_rollup_entry(p: Dict[str, Any]) -> Dict[str, Any]:
+    """One paper_rollup row, built straight from the paper's extraction."""
+    compact = compact_paper(p)
+    entry: Dict[str, Any] = {}
+    for key, spec in SYNTHESIS_SCHEMA["paper_rollup"][0].items():
+        value = compact.get(key)
+        if isinstance(spec, list):
+            entry[key] = value if isinstance(value, list) else ([value] if value else [])
+        else:
+            entry[key] = value if value not in (None, "") else "Not specified"
+    return entry
@@ -0,0 +1,100 @@
+"""
+Micro-benchmark: per-row SELECT + INSERT loop vs. bulk executemany inserts.
+
+Runs against throwaway SQLite files, never the configured DB_PATH.
+
+Usage:
+    python -m app.benchmarks.bench_insert_papers [num_rows]
+"""
+
+import os
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+from app.db import get_connection, init_db
+from app.ingestion.search_papers import bulk_insert_papers
+
+
+def make_rows(n: int, topic: str = "bench") -> List[Dict]:
+    return [
+        {
+            "title": f"Synthetic paper {i}",
+            "authors": "A. Author, B. Author",
+            "year": 2024,
+            "abstract": "Lorem ipsum " * 40,
+            "pdf_url": f"https://arxiv.org/pdf/2401.{i:05d}v1.pdf",
+            "pdf_path": None,
+            "arxiv_id": f"2401.{i:05d}v1",
+            "topic": topic,
+        }
+        for i in range(n)
+    ]
+
+
+def legacy_insert(conn, rows: List[Dict]) -> int:
+    """The previous insert_papers loop: one lookup and one INSERT per row, single commit."""
+    cur = conn.cursor()
+    inserted = 0
+    for row in rows:
+        cur.execute("SELECT id FROM papers WHERE arxiv_id = ?", (row["arxiv_id"],))
+        if cur.fetchone():
+            continue
+        cur.execute(
+            """
+            INSERT INTO papers (title, authors, year, abstract, pdf_url, pdf_path, arxiv_id, topic)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                row["title"], row["authors"], row["year"], row["abstract"],
+                row["pdf_url"], row["pdf_path"], row["arxiv_id"], row["topic"],
+            ),
+        )
+        inserted += 1
+    conn.commit()
+    return inserted
+
+
+def _fresh_db(tmpdir: str, name: str, with_index: bool) -> str:
+    path = os.path.join(tmpdir, name)
+    init_db(path)
+    if not with_index:
+        # Reproduce the old schema, which had no index on arxiv_id
+        conn = get_connection(path)
+        conn.execute("DROP INDEX IF EXISTS idx_papers_arxiv_id")
+        conn.commit()
+        conn.close()
+    return path
+
+
+def _timed(fn, *args):
+    t0 = time.perf_counter()
+    out = fn(*args)
+    return out, time.perf_counter() - t0
+
+
+def run(num_rows: int = 5000):
+    rows = make_rows(num_rows)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        legacy_conn = get_connection(_fresh_db(tmpdir, "legacy.db", with_index=False))
+        bulk_conn = get_connection(_fresh_db(tmpdir, "bulk.db", with_index=True))
+
+        print(f"[bench] {num_rows} rows")
+        for label in ("fresh insert", "re-ingest (all duplicates)"):
+            legacy_n, legacy_s = _timed(legacy_insert, legacy_conn, rows)
+            (bulk_n, bulk_skipped), bulk_s = _timed(bulk_insert_papers, bulk_conn, rows)
+            print(
+                f"[bench] {label:<28} legacy {legacy_s * 1000:8.1f} ms ({legacy_n} inserted) | "
+                f"bulk {bulk_s * 1000:8.1f} ms ({bulk_n} inserted, {bulk_skipped} skipped) | "
+                f"speedup x{legacy_s / max(bulk_s, 1e-9):.1f}"
+            )
+
+        legacy_conn.close()
+        bulk_conn.close()
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) >= 2 and sys.argv[1].isdigit() else 5000
+    run(n)
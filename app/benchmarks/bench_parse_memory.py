@@ -0,0 +1,102 @@
+"""
+Peak-memory comparison (tracemalloc): list-based parse path vs. the streaming
+page pipeline.
+
+By default pages come from a synthetic thesis-sized document generated on the
+fly (so the generator itself holds nothing); pass a PDF path to read real
+pages through PyMuPDF instead.
+
+Usage:
+    python -m app.benchmarks.bench_parse_memory [num_pages | path/to/file.pdf]
+"""
+
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Iterator
+
+from app.parsing.parse_all_pdfs import write_processed_json
+from app.parsing.pdf_loader import iter_text_by_page
+from app.parsing.section_splitter import iter_sections, split_into_sections
+from app.parsing.text_cleaner import clean_pages, iter_clean_pages
+
+
+_HEADINGS = ["Abstract", "1 Introduction", "2 Related Work", "3 Method",
+             "4 Experiments", "5 Results", "6 Discussion", "7 Limitations", "8 Conclusion"]
+_WORDS = ("we propose method results analysis approach experiments model data training "
+          "evaluation baseline benchmark accuracy robust the of and in to").split()
+
+
+def synthetic_pages(num_pages: int, seed: int = 0) -> Callable[[], Iterator[str]]:
+    def _pages() -> Iterator[str]:
+        rng = random.Random(seed)
+        per_section = max(1, num_pages // len(_HEADINGS))
+        for i in range(num_pages):
+            lines = [str(i + 1)]
+            if i % per_section == 0 and i // per_section < len(_HEADINGS):
+                lines.append(_HEADINGS[i // per_section])
+            for _ in range(45):
+                lines.append("  ".join(rng.choice(_WORDS) for _ in range(13)) + ".")
+            yield "\n".join(lines)
+    return _pages
+
+
+def pdf_pages(path: str) -> Callable[[], Iterator[str]]:
+    return lambda: iter_text_by_page(path)
+
+
+def legacy_path(pages: Iterator[str], dest: str):
+    """Previous parse_pdf: page list, cleaned list, joined string, sections dict."""
+    page_list = list(pages)
+    cleaned = clean_pages(page_list)
+    full_text = "\n".join(cleaned)
+    sections = split_into_sections(full_text)
+    with open(dest, "w") as f:
+        json.dump({"paper_id": 0, "arxiv_id": "bench", "sections": sections}, f, indent=2)
+
+
+def streaming_path(pages: Iterator[str], dest: str):
+    write_processed_json(dest, 0, "bench", iter_sections(iter_clean_pages(pages)))
+
+
+def _measure(fn, pages_factory, dest):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    fn(pages_factory(), dest)
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak, elapsed
+
+
+def run(source: str = "300"):
+    if source.isdigit():
+        pages_factory = synthetic_pages(int(source))
+        label = f"{source} synthetic pages"
+    else:
+        pages_factory = pdf_pages(source)
+        label = source
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        legacy_dest = os.path.join(tmpdir, "legacy.json")
+        stream_dest = os.path.join(tmpdir, "stream.json")
+        legacy_peak, legacy_s = _measure(legacy_path, pages_factory, legacy_dest)
+        stream_peak, stream_s = _measure(streaming_path, pages_factory, stream_dest)
+
+        with open(stream_dest) as f:
+            sections = json.load(f)["sections"]
+        text_mb = sum(len(v) for v in sections.values()) / 1e6
+        largest_mb = max((len(v) for v in sections.values()), default=0) / 1e6
+
+    print(f"[bench] {label}: {text_mb:.1f} MB of section text, largest section {largest_mb:.2f} MB")
+    print(f"[bench] list-based peak {legacy_peak / 1e6:7.1f} MB  ({legacy_s:.2f}s)")
+    print(f"[bench] streaming  peak {stream_peak / 1e6:7.1f} MB  ({stream_s:.2f}s)")
+    print(f"[bench] reduction x{legacy_peak / max(stream_peak, 1):.1f}")
+
+
+if __name__ == "__main__":
+    run(sys.argv[1] if len(sys.argv) >= 2 else "300")
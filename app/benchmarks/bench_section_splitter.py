@@ -0,0 +1,99 @@
+"""
+Benchmark: previous lookahead splitter vs. the line-anchored single-pass splitter.
+
+Generates synthetic papers whose body text mentions header words ("method",
+"results", "analysis", ...) as often as real papers do, then reports MB/s and
+how many sections each splitter produces.
+
+Usage:
+    python -m app.benchmarks.bench_section_splitter [num_papers] [paragraphs_per_section]
+"""
+
+import random
+import re
+import sys
+import time
+from typing import List
+
+from app.parsing.section_splitter import SECTION_HEADERS, split_into_sections
+
+
+_HEADINGS = [
+    "Abstract",
+    "1 Introduction",
+    "2 Related Work",
+    "3 Method",
+    "4 Experiments",
+    "5 Results and Discussion",
+    "6 Limitations",
+    "7 Conclusion",
+]
+
+_WORDS = (
+    "we propose a method whose results improve the analysis of prior approach "
+    "and our experiments show the discussion of limitations in background "
+    "models data training evaluation baseline benchmark accuracy robust attack defense"
+).split()
+
+
+def make_paper(rng: random.Random, paragraphs_per_section: int) -> str:
+    lines: List[str] = ["A Synthetic Paper Title", "Anonymous Authors"]
+    for heading in _HEADINGS:
+        lines.append(heading)
+        for _ in range(paragraphs_per_section):
+            for _ in range(6):
+                lines.append(" ".join(rng.choice(_WORDS) for _ in range(14)) + ".")
+    return "\n".join(lines)
+
+
+def legacy_split(full_text: str):
+    """The previous implementation, kept verbatim for comparison."""
+    text = full_text.lower()
+    pattern = r"(?=(" + "|".join([re.escape(h) for h in SECTION_HEADERS]) + r"))"
+    matches = list(re.finditer(pattern, text))
+    if not matches:
+        return {"full_text": full_text}, 0
+    sections = {}
+    for i, match in enumerate(matches):
+        header = match.group(0)
+        start = match.start()
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(text)
+        sections[header] = full_text[start:end].strip()
+    return sections, len(matches)
+
+
+def run(num_papers: int = 20, paragraphs_per_section: int = 40):
+    rng = random.Random(0)
+    papers = [make_paper(rng, paragraphs_per_section) for _ in range(num_papers)]
+    total_mb = sum(len(p) for p in papers) / 1e6
+    print(f"[bench] {num_papers} papers, {total_mb:.1f} MB of text")
+
+    t0 = time.perf_counter()
+    legacy_matches = 0
+    legacy_keys = 0
+    for p in papers:
+        sections, n = legacy_split(p)
+        legacy_matches += n
+        legacy_keys += len(sections)
+    legacy_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    new_sections = 0
+    for p in papers:
+        new_sections += len(split_into_sections(p))
+    new_s = time.perf_counter() - t0
+
+    print(
+        f"[bench] legacy: {total_mb / legacy_s:7.1f} MB/s, "
+        f"{legacy_matches / num_papers:.0f} header matches/paper collapsing into "
+        f"{legacy_keys / num_papers:.0f} dict keys/paper"
+    )
+    print(
+        f"[bench] new:    {total_mb / new_s:7.1f} MB/s, "
+        f"{new_sections / num_papers:.0f} sections/paper (expected {len(_HEADINGS) + 1} incl. front matter)"
+    )
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:] if a.isdigit()]
+    run(*args[:2])
@@ -10,6 +10,11 @@ LLM_PROVIDER = os.getenv("LLM_PROVIDER", "gemini").strip().lower()
 # Ollama settings (only used when LLM_PROVIDER == "ollama")
 OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "mistral")
 OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434")
+# Pooled keep-alive connections shared by all agents in a process, and
+# connect / read timeouts (seconds) for each call
+OLLAMA_POOL_SIZE = int(os.getenv("OLLAMA_POOL_SIZE", "8"))
+OLLAMA_CONNECT_TIMEOUT_S = float(os.getenv("OLLAMA_CONNECT_TIMEOUT_S", "5"))
+OLLAMA_READ_TIMEOUT_S = float(os.getenv("OLLAMA_READ_TIMEOUT_S", "180"))
 
 # Gemini config
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
@@ -27,4 +32,122 @@ CRITIC_GEMINI_API_KEY = os.getenv("CRITIC_GEMINI_API_KEY", GEMINI_API_KEY)
 CRITIC_GEMINI_MODEL = os.getenv("CRITIC_GEMINI_MODEL", "gemini-1.5-pro")
 
 # SQLite DB path
-DB_PATH = os.getenv("DB_PATH", "research.db")
\ No newline at end of file
+DB_PATH = os.getenv("DB_PATH", "research.db")
+
+# PDF download engine
+# Number of concurrent download workers (threads) shared across all hosts
+PDF_DOWNLOAD_WORKERS = int(os.getenv("PDF_DOWNLOAD_WORKERS", "4"))
+
+# Per-host token bucket: sustained requests/second and burst size. Redirect
+# hops count as requests. The defaults follow arXiv's guidance of one request
+# every 3 seconds per client; raise them only for hosts that allow more.
+PDF_HOST_RATE_PER_S = float(os.getenv("PDF_HOST_RATE_PER_S", str(1 / 3)))
+PDF_HOST_BURST = int(os.getenv("PDF_HOST_BURST", "1"))
+
+# arXiv API paging
+# Results per API request and minimum spacing between requests (arXiv asks for ~3s)
+ARXIV_PAGE_SIZE = int(os.getenv("ARXIV_PAGE_SIZE", "100"))
+ARXIV_PAGE_DELAY_S = float(os.getenv("ARXIV_PAGE_DELAY_S", "3.0"))
+
+# Content-addressed PDF store: send conditional requests (ETag / Last-Modified)
+# even for versioned arXiv ids, which are otherwise served straight from disk
+PDF_STORE_REVALIDATE = os.getenv("PDF_STORE_REVALIDATE", "0").strip().lower() in ("1", "true", "yes")
+
+# Streaming PDF transfers: hard size cap, resume attempts, connect/read timeouts
+PDF_MAX_BYTES = int(os.getenv("PDF_MAX_BYTES", str(50 * 1024 * 1024)))
+PDF_MAX_RESUMES = int(os.getenv("PDF_MAX_RESUMES", "3"))
+PDF_CONNECT_TIMEOUT_S = float(os.getenv("PDF_CONNECT_TIMEOUT_S", "10"))
+PDF_READ_TIMEOUT_S = float(os.getenv("PDF_READ_TIMEOUT_S", "60"))
+
+# arXiv query response cache (raw Atom XML, gzip) – seconds; 0 disables
+ARXIV_CACHE_TTL_S = float(os.getenv("ARXIV_CACHE_TTL_S", str(6 * 3600)))
+
+# PDF parsing: worker processes (1 = parse in-process) and PDFs per submitted task
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", str(os.cpu_count() or 1)))
+PARSE_CHUNK_SIZE = int(os.getenv("PARSE_CHUNK_SIZE", "4"))
+
+# Processed-paper storage: "json" (one file per paper in data/processed) or
+# "sqlite" (compressed per-section rows in data/processed/sections.db)
+PROCESSED_BACKEND = os.getenv("PROCESSED_BACKEND", "json").strip().lower()
+
+# Raw per-page PDF text cache (data/cache/pages), keyed by PDF hash + PyMuPDF
+# version – size cap in MB with LRU eviction; 0 disables
+PAGE_CACHE_MAX_MB = float(os.getenv("PAGE_CACHE_MAX_MB", "1024"))
+
+# PDFs with more pages than this are split into page ranges across the parse
+# pool (only when their page text isn't cached yet); 0 disables sharding
+PARSE_SHARD_PAGES = int(os.getenv("PARSE_SHARD_PAGES", "200"))
+
+# LLM response cache (data/cache/llm_cache.db): entry lifetime in seconds
+# (0 = never expire), size cap in MB (0 disables), and a bypass flag that
+# skips lookups but still stores fresh responses
+LLM_CACHE_TTL_S = float(os.getenv("LLM_CACHE_TTL_S", str(30 * 24 * 3600)))
+LLM_CACHE_MAX_MB = float(os.getenv("LLM_CACHE_MAX_MB", "512"))
+LLM_CACHE_BYPASS = os.getenv("LLM_CACHE_BYPASS", "0").strip().lower() in ("1", "true", "yes")
+
+# Extraction: concurrent LLM requests (1 = one paper at a time). Match it to
+# OLLAMA_NUM_PARALLEL on the Ollama server, or the Gemini rate limits.
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", "4"))
+
+# LLM generation: stream tokens as they arrive (JSON requests stop as soon as
+# the top-level object closes) and cap the output length in tokens
+LLM_STREAM = os.getenv("LLM_STREAM", "1").strip().lower() in ("1", "true", "yes")
+LLM_MAX_OUTPUT_TOKENS = int(os.getenv("LLM_MAX_OUTPUT_TOKENS", "4096"))
+
+# Extraction prompt size limit in estimated tokens (instructions + selected sections);
+# keep it below the model's context window
+EXTRACTION_TOKEN_BUDGET = int(os.getenv("EXTRACTION_TOKEN_BUDGET", "6000"))
+
+# Chunked (map-reduce) extraction: "auto" (only papers whose abstract, method,
+# experiments/results or unsplit text - full_text/front_matter, e.g. a paper
+# without headings - would be cut from the budgeted prompt), "always", or
+# "off" (keep the best sections only).
+# Windows overlap by EXTRACTION_WINDOW_OVERLAP_TOKENS; up to EXTRACTION_MAP_WORKERS
+# windows of one paper are extracted at once (on top of EXTRACTION_WORKERS papers).
+EXTRACTION_CHUNKED = os.getenv("EXTRACTION_CHUNKED", "auto").strip().lower()
+EXTRACTION_WINDOW_OVERLAP_TOKENS = int(os.getenv("EXTRACTION_WINDOW_OVERLAP_TOKENS", "300"))
+EXTRACTION_MAP_WORKERS = int(os.getenv("EXTRACTION_MAP_WORKERS", "4"))
+
+# Hierarchical synthesis for large topics: "auto" (when there are more than
+# SYNTHESIS_GROUP_SIZE papers), "always", or "off" (one prompt with every paper).
+# Papers are synthesized SYNTHESIS_GROUP_SIZE at a time, then the partial
+# syntheses are merged SYNTHESIS_MERGE_FAN_IN at a time, with up to
+# SYNTHESIS_WORKERS calls of the same level in flight.
+SYNTHESIS_HIERARCHICAL = os.getenv("SYNTHESIS_HIERARCHICAL", "auto").strip().lower()
+SYNTHESIS_GROUP_SIZE = int(os.getenv("SYNTHESIS_GROUP_SIZE", "20"))
+SYNTHESIS_MERGE_FAN_IN = int(os.getenv("SYNTHESIS_MERGE_FAN_IN", "8"))
+SYNTHESIS_WORKERS = int(os.getenv("SYNTHESIS_WORKERS", "4"))
+
+# Constrained JSON output for JSON requests: "off", "json" (Ollama format="json",
+# Gemini response_mime_type) or "schema" (also pass the agent's JSON schema).
+# Needs Ollama >= 0.5 for schemas and a Gemini model with JSON mode.
+LLM_CONSTRAINED_OUTPUT = os.getenv("LLM_CONSTRAINED_OUTPUT", "off").strip().lower()
+
+# LLM call scheduling, per provider and shared by every agent in a process:
+# max concurrent calls and requests per minute (0 = no limit). Retryable
+# failures (429/5xx, timeouts) are retried up to LLM_RETRY_ATTEMPTS times in
+# total, with exponential backoff and jitter from LLM_RETRY_BASE_S up to
+# LLM_RETRY_MAX_S, or after the server's Retry-After.
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "4"))
+GEMINI_RPM = float(os.getenv("GEMINI_RPM", "15"))
+OLLAMA_MAX_CONCURRENCY = int(os.getenv("OLLAMA_MAX_CONCURRENCY", "4"))
+OLLAMA_RPM = float(os.getenv("OLLAMA_RPM", "0"))
+LLM_RETRY_ATTEMPTS = int(os.getenv("LLM_RETRY_ATTEMPTS", "4"))
+LLM_RETRY_BASE_S = float(os.getenv("LLM_RETRY_BASE_S", "2"))
+LLM_RETRY_MAX_S = float(os.getenv("LLM_RETRY_MAX_S", "120"))
+
+# Papers whose extraction still fails with a retryable error are re-queued
+# (behind the rest of the batch) until they have been tried this many times
+EXTRACTION_MAX_ATTEMPTS = int(os.getenv("EXTRACTION_MAX_ATTEMPTS", "3"))
+
+# Hedged requests: when LLM_HEDGE_PROVIDER is set, a call still running after
+# the primary model's LLM_HEDGE_PERCENTILE latency (over the last
+# LLM_HEDGE_WINDOW calls; LLM_HEDGE_INITIAL_DELAY_S until LLM_HEDGE_MIN_SAMPLES
+# were seen) is duplicated to this provider/model and the first answer wins.
+# LLM_HEDGE_MODEL defaults to the provider's usual model.
+LLM_HEDGE_PROVIDER = os.getenv("LLM_HEDGE_PROVIDER", "").strip().lower()
+LLM_HEDGE_MODEL = os.getenv("LLM_HEDGE_MODEL", "").strip()
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+LLM_HEDGE_WINDOW = int(os.getenv("LLM_HEDGE_WINDOW", "200"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+LLM_HEDGE_INITIAL_DELAY_S = float(os.getenv("LLM_HEDGE_INITIAL_DELAY_S", "30"))
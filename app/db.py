@@ -1,13 +1,15 @@
 import sqlite3
+from typing import Optional
+
 from app.config import DB_PATH
 
 
-def get_connection():
-    return sqlite3.connect(DB_PATH)
+def get_connection(db_path: Optional[str] = None):
+    return sqlite3.connect(db_path or DB_PATH)
 
 
-def init_db():
-    conn = get_connection()
+def init_db(db_path: Optional[str] = None):
+    conn = get_connection(db_path)
     cur = conn.cursor()
 
     # Very minimal for now; we’ll extend later
@@ -25,6 +27,22 @@ def init_db():
         );
     """)
 
+    # One row per arXiv id; lets inserts dedupe with ON CONFLICT instead of a lookup per row.
+    # Databases from before the index may hold duplicates: keep the oldest row of each.
+    cur.execute("""
+        DELETE FROM papers
+        WHERE arxiv_id IS NOT NULL
+          AND rowid NOT IN (
+              SELECT MIN(rowid) FROM papers WHERE arxiv_id IS NOT NULL GROUP BY arxiv_id
+          );
+    """)
+    if cur.rowcount > 0:
+        print(f"[db] Removed {cur.rowcount} duplicate arxiv_id rows from papers.")
+    cur.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_papers_arxiv_id
+        ON papers(arxiv_id);
+    """)
+
     cur.execute("""
         CREATE TABLE IF NOT EXISTS paper_extractions (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -49,6 +67,75 @@ def init_db():
         ON paper_extractions(paper_id, model_provider, model_name);
     """)
 
+    # Resumable arXiv harvest cursors: next `start` offset per topic
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS arxiv_cursors (
+            topic TEXT PRIMARY KEY,
+            next_start INTEGER NOT NULL DEFAULT 0,
+            total_results INTEGER,
+            completed INTEGER NOT NULL DEFAULT 0,
+            updated_at TEXT DEFAULT (datetime('now'))
+        );
+    """)
+
+    # What was parsed, from which PDF bytes, by which parser version (see app/parsing/parse_manifest.py)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS parse_manifest (
+            paper_id INTEGER PRIMARY KEY,
+            arxiv_id TEXT,
+            pdf_path TEXT,
+            pdf_size INTEGER,
+            pdf_mtime_ns INTEGER,
+            pdf_sha256 TEXT,
+            parser_version TEXT,
+            output_path TEXT,
+            parsed_at TEXT DEFAULT (datetime('now'))
+        );
+    """)
+
+    # Parsed section text, one row per section, plus an external-content FTS5
+    # index over it kept in sync by triggers (see app/parsing/section_index.py)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS paper_sections (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            paper_id INTEGER NOT NULL,
+            ordinal INTEGER NOT NULL,
+            name TEXT NOT NULL,
+            content TEXT,
+            UNIQUE (paper_id, ordinal),
+            FOREIGN KEY (paper_id) REFERENCES papers(id)
+        );
+    """)
+
+    try:
+        cur.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS paper_sections_fts USING fts5(
+                name, content,
+                content='paper_sections', content_rowid='id',
+                tokenize='porter unicode61'
+            );
+        """)
+        cur.execute("""
+            CREATE TRIGGER IF NOT EXISTS paper_sections_ai AFTER INSERT ON paper_sections BEGIN
+                INSERT INTO paper_sections_fts(rowid, name, content) VALUES (new.id, new.name, new.content);
+            END;
+        """)
+        cur.execute("""
+            CREATE TRIGGER IF NOT EXISTS paper_sections_ad AFTER DELETE ON paper_sections BEGIN
+                INSERT INTO paper_sections_fts(paper_sections_fts, rowid, name, content)
+                VALUES ('delete', old.id, old.name, old.content);
+            END;
+        """)
+        cur.execute("""
+            CREATE TRIGGER IF NOT EXISTS paper_sections_au AFTER UPDATE ON paper_sections BEGIN
+                INSERT INTO paper_sections_fts(paper_sections_fts, rowid, name, content)
+                VALUES ('delete', old.id, old.name, old.content);
+                INSERT INTO paper_sections_fts(rowid, name, content) VALUES (new.id, new.name, new.content);
+            END;
+        """)
+    except sqlite3.OperationalError as e:
+        print(f"[db] Warning: FTS5 unavailable ({e}); section search disabled.")
+
     conn.commit()
     conn.close()
 
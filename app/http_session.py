@@ -0,0 +1,45 @@
+"""
+Shared HTTP session factory.
+
+A requests.Session keeps TCP/TLS connections alive between calls; the mounted
+HTTPAdapter controls how many pooled connections are kept per host so that
+concurrent threads can reuse them instead of reconnecting.
+"""
+
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from app.rate_limit import HostRateLimiter
+
+
+class RateLimitedSession(requests.Session):
+    """
+    Session that takes a token from a per-host limiter before every request,
+    so only requests that actually hit the network are rate limited.
+
+    The limiter sits in send(), which requests also uses for each redirect
+    hop (http→https, abs→pdf), so redirects are throttled like any request.
+    """
+
+    def __init__(self, limiter: HostRateLimiter):
+        super().__init__()
+        self.limiter = limiter
+
+    def send(self, request, **kwargs):
+        self.limiter.acquire(request.url)
+        return super().send(request, **kwargs)
+
+
+def build_session(
+    pool_size: int = 10,
+    user_agent: str = "ResearchCopilot/1.0",
+    limiter: Optional[HostRateLimiter] = None,
+) -> requests.Session:
+    session = RateLimitedSession(limiter) if limiter is not None else requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update({"User-Agent": user_agent})
+    return session
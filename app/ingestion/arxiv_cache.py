@@ -0,0 +1,124 @@
+"""
+TTL cache for arXiv API responses.
+
+Two tiers, both keyed by the normalized query + pagination parameters:
+- disk: the raw Atom XML, gzip-compressed, under data/cache/arxiv/
+- memory: the already-parsed feed, so repeated runs in the same process
+  (e.g. Streamlit re-runs) skip both the network and feedparser
+
+Entries older than the TTL are ignored and overwritten on the next fetch.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+from app.config import ARXIV_CACHE_TTL_S
+
+
+ARXIV_CACHE_DIR = os.path.join("data", "cache", "arxiv")
+
+
+def make_cache_key(topic: str, start: int, max_results: int) -> str:
+    normalized = " ".join(topic.lower().split())
+    payload = json.dumps({"q": normalized, "start": int(start), "max_results": int(max_results)}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ArxivQueryCache:
+    def __init__(self, cache_dir: str = ARXIV_CACHE_DIR, ttl_s: float = ARXIV_CACHE_TTL_S, max_memory_entries: int = 64):
+        self.cache_dir = cache_dir
+        self.ttl_s = ttl_s
+        self.max_memory_entries = max_memory_entries
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_s > 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.xml.gz")
+
+    def _fresh(self, stored_at: float) -> bool:
+        return (time.time() - stored_at) < self.ttl_s
+
+    def _remember(self, key: str, feed: Any, stored_at: float):
+        with self._lock:
+            self._memory[key] = (stored_at, feed)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_memory_entries:
+                self._memory.popitem(last=False)
+
+    def get_feed(self, key: str, parse) -> Optional[Any]:
+        """
+        Return a cached parsed feed, or None on a miss. `parse` turns raw XML
+        bytes into a feed and is only called on a disk hit.
+        """
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            hit = self._memory.get(key)
+            if hit and self._fresh(hit[0]):
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return hit[1]
+
+        path = self._path(key)
+        try:
+            stored_at = os.path.getmtime(path)
+        except OSError:
+            stored_at = None
+
+        if stored_at is not None and self._fresh(stored_at):
+            try:
+                with gzip.open(path, "rb") as f:
+                    raw = f.read()
+            except (OSError, EOFError):
+                raw = None
+            if raw:
+                feed = parse(raw)
+                self._remember(key, feed, stored_at)
+                with self._lock:
+                    self.stats["disk_hits"] += 1
+                return feed
+
+        with self._lock:
+            self.stats["misses"] += 1
+        return None
+
+    def put(self, key: str, raw: bytes, feed: Any):
+        if not self.enabled:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with gzip.open(tmp_path, "wb", compresslevel=6) as f:
+            f.write(raw)
+        os.replace(tmp_path, path)
+        self._remember(key, feed, time.time())
+
+    def summary(self) -> str:
+        with self._lock:
+            hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+            return (
+                f"hits={hits} (memory={self.stats['memory_hits']}, disk={self.stats['disk_hits']}), "
+                f"misses={self.stats['misses']}, ttl={self.ttl_s:g}s"
+            )
+
+
+_default_cache: Optional[ArxivQueryCache] = None
+
+
+def get_arxiv_cache() -> ArxivQueryCache:
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ArxivQueryCache()
+    return _default_cache
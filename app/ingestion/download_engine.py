@@ -0,0 +1,114 @@
+"""
+Bounded-concurrency PDF download engine.
+
+A small thread pool overlaps TLS handshakes and transfers, while a shared
+per-host token bucket keeps the request rate to each server (arXiv) polite.
+Results are handed back to the calling thread so DB writes stay single-threaded.
+"""
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Iterable, Optional, Tuple, Union
+
+import requests
+
+from app.config import PDF_DOWNLOAD_WORKERS, PDF_HOST_BURST, PDF_HOST_RATE_PER_S
+from app.http_session import build_session
+from app.rate_limit import HostRateLimiter
+
+
+# (paper_id, arxiv_id, pdf_url)
+DownloadJob = Tuple[int, str, str]
+
+# fetch(session, paper_id, arxiv_id, pdf_url) -> local path, or (local path, bytes
+# transferred) when the fetcher knows better than the file size (e.g. cache hits);
+# None on failure
+FetchFn = Callable[[requests.Session, int, str, str], Union[None, str, Tuple[str, int]]]
+
+# on_done(paper_id, arxiv_id, local_path) – called in the caller's thread
+DoneFn = Callable[[int, str, str], None]
+
+
+def _format_bytes(n: float) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if n < 1024 or unit == "GB":
+            return f"{n:.1f} {unit}"
+        n /= 1024.0
+    return f"{n:.1f} GB"
+
+
+def run_downloads(
+    jobs: Iterable[DownloadJob],
+    fetch: FetchFn,
+    on_done: Optional[DoneFn] = None,
+    max_workers: int = PDF_DOWNLOAD_WORKERS,
+    rate_per_host: float = PDF_HOST_RATE_PER_S,
+    burst: int = PDF_HOST_BURST,
+) -> Dict[str, float]:
+    """
+    Download all jobs with at most `max_workers` transfers in flight.
+
+    Every HTTP request made through the provided session first takes a token
+    from its host's bucket, so the aggregate rate per host never exceeds
+    `rate_per_host` (after an initial burst of `burst` requests), regardless
+    of the worker count. Fetchers that serve from a local cache cost nothing.
+
+    Returns a stats dict: ok, failed, bytes, seconds, papers_per_s, bytes_per_s.
+    """
+    jobs = [j for j in jobs if j[2]]
+    stats = {"ok": 0, "failed": 0, "bytes": 0, "seconds": 0.0, "papers_per_s": 0.0, "bytes_per_s": 0.0}
+    if not jobs:
+        return stats
+
+    max_workers = max(1, min(max_workers, len(jobs)))
+    limiter = HostRateLimiter(rate_per_host, burst)
+    session = build_session(pool_size=max_workers, limiter=limiter)
+
+    def _worker(job: DownloadJob):
+        paper_id, arxiv_id, pdf_url = job
+        return fetch(session, paper_id, arxiv_id, pdf_url)
+
+    print(f"[pdf] Downloading {len(jobs)} PDFs with {max_workers} workers "
+          f"({rate_per_host:g} req/s per host, burst {burst})")
+    started = time.perf_counter()
+
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pdf") as pool:
+            futures = {pool.submit(_worker, job): job for job in jobs}
+            for fut in as_completed(futures):
+                paper_id, arxiv_id, _ = futures[fut]
+                try:
+                    result = fut.result()
+                except Exception as e:
+                    print(f"[pdf] Failed to download {arxiv_id}: {e}")
+                    result = None
+
+                if not result:
+                    stats["failed"] += 1
+                    continue
+
+                if isinstance(result, tuple):
+                    local_path, nbytes = result
+                else:
+                    local_path = result
+                    nbytes = os.path.getsize(local_path) if os.path.exists(local_path) else 0
+
+                stats["ok"] += 1
+                stats["bytes"] += nbytes
+                if on_done is not None:
+                    on_done(paper_id, arxiv_id, local_path)
+    finally:
+        session.close()
+
+    elapsed = max(time.perf_counter() - started, 1e-9)
+    stats["seconds"] = elapsed
+    stats["papers_per_s"] = stats["ok"] / elapsed
+    stats["bytes_per_s"] = stats["bytes"] / elapsed
+
+    print(
+        f"[pdf] Downloaded {stats['ok']} PDFs ({stats['failed']} failed), "
+        f"{_format_bytes(stats['bytes'])} in {elapsed:.1f}s → "
+        f"{stats['papers_per_s']:.2f} papers/s, {_format_bytes(stats['bytes_per_s'])}/s"
+    )
+    return stats
@@ -1,10 +1,11 @@
 import os
-import time
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 
 import requests
 
 from app.db import get_connection
+from app.ingestion.download_engine import run_downloads
+from app.ingestion.pdf_store import get_pdf_store
 
 
 RAW_PDF_DIR = os.path.join("data", "raw_pdfs")
@@ -14,9 +15,10 @@ def ensure_pdf_dir():
     os.makedirs(RAW_PDF_DIR, exist_ok=True)
 
 
-def get_papers_needing_pdfs(limit: int = 20) -> List[Tuple[int, str, str]]:
+def get_papers_needing_pdfs(limit: int = 20, after_id: int = 0) -> List[Tuple[int, str, str]]:
     """
     Return list of (id, arxiv_id, pdf_url) for papers where pdf_path is NULL.
+    Rows are ordered by id; pass the last seen id as `after_id` to page forward.
     """
     conn = get_connection()
     cur = conn.cursor()
@@ -26,9 +28,11 @@ def get_papers_needing_pdfs(limit: int = 20) -> List[Tuple[int, str, str]]:
         SELECT id, arxiv_id, pdf_url
         FROM papers
         WHERE pdf_path IS NULL
+          AND id > ?
+        ORDER BY id ASC
         LIMIT ?
         """,
-        (limit,),
+        (after_id, limit),
     )
     rows = cur.fetchall()
     conn.close()
@@ -46,62 +50,78 @@ def update_pdf_path(paper_id: int, pdf_path: str):
     conn.close()
 
 
-def download_pdf(paper_id: int, arxiv_id: str, pdf_url: str) -> str:
+def download_pdf(
+    paper_id: int,
+    arxiv_id: str,
+    pdf_url: str,
+    session: Optional[requests.Session] = None,
+) -> str:
     """
     Download a single PDF and return the local path, or None on failure.
-    """
-    ensure_pdf_dir()
-    # Nice file name: 12_2401.01234.pdf
-    filename = f"{paper_id}_{arxiv_id.replace('/', '_')}.pdf"
-    dest_path = os.path.join(RAW_PDF_DIR, filename)
 
+    Files go through the content-addressed store, so a PDF already fetched
+    for another paper row or topic is reused instead of downloaded again.
+    """
     print(f"[pdf] Downloading {arxiv_id} from {pdf_url}")
     try:
-        resp = requests.get(pdf_url, stream=True, timeout=30)
-        resp.raise_for_status()
+        dest_path, nbytes = get_pdf_store().fetch(arxiv_id, pdf_url, session=session)
     except Exception as e:
         print(f"[pdf] Failed to download {arxiv_id}: {e}")
         return None
 
-    try:
-        with open(dest_path, "wb") as f:
-            for chunk in resp.iter_content(chunk_size=8192):
-                if chunk:
-                    f.write(chunk)
-    except Exception as e:
-        print(f"[pdf] Error writing file for {arxiv_id}: {e}")
-        # cleanup partial
-        if os.path.exists(dest_path):
-            os.remove(dest_path)
-        return None
-
-    print(f"[pdf] Saved to {dest_path}")
+    if nbytes:
+        print(f"[pdf] Saved to {dest_path}")
+    else:
+        print(f"[pdf] Reused stored copy {dest_path}")
     return dest_path
 
 
-def download_pdfs(batch_size: int = 10, delay_seconds: float = 3.0):
+def download_pdfs(
+    batch_size: int = 10,
+    delay_seconds: Optional[float] = None,
+    max_workers: Optional[int] = None,
+):
     """
     Download PDFs for all papers missing pdf_path, in batches.
-    Delay between downloads to be nice to arXiv.
+
+    Each batch runs through the concurrent download engine. Politeness to
+    arXiv comes from its per-host token bucket; `delay_seconds`, if given,
+    is translated into a rate of one request per `delay_seconds`.
     """
     ensure_pdf_dir()
     total_downloaded = 0
+    last_id = 0
+
+    engine_kwargs = {}
+    if delay_seconds:
+        engine_kwargs["rate_per_host"] = 1.0 / delay_seconds
+        engine_kwargs["burst"] = 1
+    if max_workers:
+        engine_kwargs["max_workers"] = max_workers
+
+    store = get_pdf_store()
+
+    def _fetch(session, paper_id, arxiv_id, pdf_url):
+        return store.fetch(arxiv_id, pdf_url, session=session)
 
     while True:
-        rows = get_papers_needing_pdfs(limit=batch_size)
+        rows = get_papers_needing_pdfs(limit=batch_size, after_id=last_id)
         if not rows:
             print("[pdf] No more papers needing PDFs.")
             break
+        last_id = rows[-1][0]
 
-        for paper_id, arxiv_id, pdf_url in rows:
-            local_path = download_pdf(paper_id, arxiv_id, pdf_url)
-            if local_path:
-                update_pdf_path(paper_id, local_path)
-                total_downloaded += 1
-            time.sleep(delay_seconds)  # be polite to arXiv
+        stats = run_downloads(
+            rows,
+            fetch=_fetch,
+            on_done=lambda paper_id, _arxiv_id, path: update_pdf_path(paper_id, path),
+            **engine_kwargs,
+        )
+        total_downloaded += stats["ok"]
 
     print(f"[pdf] Done. Total PDFs downloaded: {total_downloaded}")
+    print(f"[pdf-store] {store.summary()}")
 
 
 if __name__ == "__main__":
-    download_pdfs(batch_size=5, delay_seconds=3.0)
\ No newline at end of file
+    download_pdfs(batch_size=20)
@@ -0,0 +1,191 @@
+"""
+Streaming, resumable file downloads.
+
+Bodies are streamed in fixed-size chunks to `<dest>.part` and renamed into
+place only once complete, so memory stays flat regardless of file size and a
+reader never sees a half-written file. If a transfer dies mid-way, the next
+attempt (in this call or a later run) continues from the partial file with an
+HTTP Range request.
+"""
+
+import hashlib
+import os
+from typing import Dict, Optional
+
+import requests
+
+from app.config import (
+    PDF_CONNECT_TIMEOUT_S,
+    PDF_MAX_BYTES,
+    PDF_MAX_RESUMES,
+    PDF_READ_TIMEOUT_S,
+)
+
+
+CHUNK_SIZE = 64 * 1024
+
+_RETRYABLE = (
+    requests.exceptions.ConnectionError,
+    requests.exceptions.ChunkedEncodingError,
+    requests.exceptions.Timeout,
+)
+
+
+class DownloadTooLarge(RuntimeError):
+    pass
+
+
+def _hash_existing(path: str, hasher) -> None:
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            hasher.update(chunk)
+
+
+def _total_size(resp: requests.Response, offset: int) -> Optional[int]:
+    """
+    Full size of the resource, from Content-Range on 206 or Content-Length on 200.
+    """
+    content_range = resp.headers.get("Content-Range", "")
+    if "/" in content_range:
+        total = content_range.rsplit("/", 1)[-1]
+        if total.isdigit():
+            return int(total)
+    length = resp.headers.get("Content-Length")
+    if length and length.isdigit():
+        return int(length) + (offset if resp.status_code == 206 else 0)
+    return None
+
+
+def download_to_file(
+    url: str,
+    dest_path: str,
+    session: Optional[requests.Session] = None,
+    headers: Optional[Dict[str, str]] = None,
+    max_bytes: int = PDF_MAX_BYTES,
+    max_resumes: int = PDF_MAX_RESUMES,
+    compute_sha256: bool = False,
+) -> Dict:
+    """
+    Stream `url` into `dest_path`, resuming a leftover `<dest_path>.part`.
+
+    - `headers` are sent on every attempt (e.g. If-None-Match); resumed
+      attempts add Range and, when a validator is known, If-Range so a
+      changed resource restarts from zero instead of being spliced.
+    - Transfers larger than `max_bytes` raise DownloadTooLarge and the
+      partial file is removed.
+    - With `compute_sha256`, the digest of the final file is computed while
+      streaming (a resumed prefix is hashed from disk first).
+
+    Returns a dict with: not_modified, bytes_total, bytes_downloaded,
+    resumed, etag, last_modified, sha256.
+    """
+    http = session or requests
+    part_path = dest_path + ".part"
+    os.makedirs(os.path.dirname(dest_path) or ".", exist_ok=True)
+
+    result = {
+        "not_modified": False,
+        "bytes_total": 0,
+        "bytes_downloaded": 0,
+        "resumed": False,
+        "etag": None,
+        "last_modified": None,
+        "sha256": None,
+    }
+    base_headers = dict(headers or {})
+    validator = None
+    attempts = 0
+
+    while True:
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        req_headers = dict(base_headers)
+        if offset:
+            req_headers["Range"] = f"bytes={offset}-"
+            # Conditional GET headers and Range don't mix well; If-Range covers both
+            req_headers.pop("If-None-Match", None)
+            req_headers.pop("If-Modified-Since", None)
+            if validator:
+                req_headers["If-Range"] = validator
+
+        try:
+            resp = http.get(
+                url,
+                headers=req_headers,
+                stream=True,
+                timeout=(PDF_CONNECT_TIMEOUT_S, PDF_READ_TIMEOUT_S),
+            )
+        except _RETRYABLE:
+            attempts += 1
+            if attempts > max_resumes:
+                raise
+            continue
+
+        try:
+            if resp.status_code == 304:
+                result["not_modified"] = True
+                return result
+
+            if resp.status_code == 416 and offset:
+                # Our partial file doesn't fit the resource any more; start over
+                os.remove(part_path)
+                continue
+
+            resp.raise_for_status()
+            result["etag"] = resp.headers.get("ETag")
+            result["last_modified"] = resp.headers.get("Last-Modified")
+            validator = result["etag"] or result["last_modified"]
+
+            if resp.status_code == 206 and offset:
+                mode = "ab"
+                result["resumed"] = True
+            else:
+                # Server ignored the Range (or resource changed): restart
+                offset = 0
+                mode = "wb"
+
+            total = _total_size(resp, offset)
+            if total is not None and total > max_bytes:
+                raise DownloadTooLarge(f"{url} is {total} bytes (limit {max_bytes})")
+
+            hasher = hashlib.sha256() if compute_sha256 else None
+            if hasher is not None and offset:
+                _hash_existing(part_path, hasher)
+
+            written = offset
+            try:
+                with open(part_path, mode) as f:
+                    for chunk in resp.iter_content(chunk_size=CHUNK_SIZE):
+                        if not chunk:
+                            continue
+                        written += len(chunk)
+                        if written > max_bytes:
+                            raise DownloadTooLarge(f"{url} exceeded {max_bytes} bytes")
+                        f.write(chunk)
+                        if hasher is not None:
+                            hasher.update(chunk)
+                        result["bytes_downloaded"] += len(chunk)
+            except _RETRYABLE:
+                attempts += 1
+                if attempts > max_resumes:
+                    raise
+                continue
+        except DownloadTooLarge:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+            raise
+        finally:
+            resp.close()
+
+        if total is not None and written < total:
+            attempts += 1
+            if attempts > max_resumes:
+                raise requests.exceptions.ChunkedEncodingError(
+                    f"{url}: got {written} of {total} bytes"
+                )
+            continue
+
+        os.replace(part_path, dest_path)
+        result["bytes_total"] = written
+        if hasher is not None:
+            result["sha256"] = hasher.hexdigest()
+        return result
@@ -0,0 +1,230 @@
+"""
+Content-addressed PDF store.
+
+Blobs live under data/raw_pdfs/sha256/<aa>/<sha256>.pdf, so the same PDF is
+stored once no matter how many topics or paper rows point at it. A small
+SQLite manifest (data/raw_pdfs/manifest.db) maps arXiv id + version to a
+blob and keeps the ETag / Last-Modified validators for conditional refetches.
+
+Deleting data/raw_pdfs removes blobs and manifest together.
+"""
+
+import os
+import re
+import sqlite3
+import threading
+from typing import Dict, Optional, Tuple
+
+import requests
+
+from app.config import PDF_STORE_REVALIDATE
+from app.ingestion.http_download import download_to_file
+
+
+RAW_PDF_DIR = os.path.join("data", "raw_pdfs")
+
+_VERSION_RE = re.compile(r"^(?P<base>.+?)(?P<version>v\d+)?$")
+
+
+def split_arxiv_id(arxiv_id: str) -> Tuple[str, str]:
+    """
+    '2401.01234v2' -> ('2401.01234', 'v2'); unversioned ids get version ''.
+    """
+    m = _VERSION_RE.match(arxiv_id.strip())
+    if not m:
+        return arxiv_id, ""
+    return m.group("base"), m.group("version") or ""
+
+
+class PdfStore:
+    def __init__(self, root: str = RAW_PDF_DIR):
+        self.root = root
+        self.blob_dir = os.path.join(root, "sha256")
+        self.manifest_path = os.path.join(root, "manifest.db")
+        self.stats = {"hits": 0, "not_modified": 0, "downloaded": 0, "deduplicated": 0}
+        self._stats_lock = threading.Lock()
+
+    def _bump(self, key: str):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def summary(self) -> str:
+        with self._stats_lock:
+            return ", ".join(f"{k}={v}" for k, v in self.stats.items())
+
+    # --------------------
+    # Manifest
+    # --------------------
+    def _connect(self):
+        os.makedirs(self.root, exist_ok=True)
+        conn = sqlite3.connect(self.manifest_path, timeout=30)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS pdf_manifest (
+                arxiv_id TEXT NOT NULL,
+                version TEXT NOT NULL DEFAULT '',
+                sha256 TEXT NOT NULL,
+                size INTEGER,
+                etag TEXT,
+                last_modified TEXT,
+                source_url TEXT,
+                fetched_at TEXT DEFAULT (datetime('now')),
+                PRIMARY KEY (arxiv_id, version)
+            );
+        """)
+        return conn
+
+    def lookup(self, arxiv_id: str) -> Optional[Dict]:
+        base, version = split_arxiv_id(arxiv_id)
+        conn = self._connect()
+        row = conn.execute(
+            """
+            SELECT sha256, size, etag, last_modified
+            FROM pdf_manifest
+            WHERE arxiv_id = ? AND version = ?
+            """,
+            (base, version),
+        ).fetchone()
+        conn.close()
+        if not row:
+            return None
+        return {"sha256": row[0], "size": row[1], "etag": row[2], "last_modified": row[3]}
+
+    def record(
+        self,
+        arxiv_id: str,
+        sha256: str,
+        size: int,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+        source_url: Optional[str] = None,
+    ):
+        base, version = split_arxiv_id(arxiv_id)
+        conn = self._connect()
+        conn.execute(
+            """
+            INSERT INTO pdf_manifest (arxiv_id, version, sha256, size, etag, last_modified, source_url, fetched_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, datetime('now'))
+            ON CONFLICT(arxiv_id, version) DO UPDATE SET
+                sha256 = excluded.sha256,
+                size = excluded.size,
+                etag = excluded.etag,
+                last_modified = excluded.last_modified,
+                source_url = excluded.source_url,
+                fetched_at = excluded.fetched_at
+            """,
+            (base, version, sha256, size, etag, last_modified, source_url),
+        )
+        conn.commit()
+        conn.close()
+
+    def touch(self, arxiv_id: str):
+        base, version = split_arxiv_id(arxiv_id)
+        conn = self._connect()
+        conn.execute(
+            "UPDATE pdf_manifest SET fetched_at = datetime('now') WHERE arxiv_id = ? AND version = ?",
+            (base, version),
+        )
+        conn.commit()
+        conn.close()
+
+    # --------------------
+    # Blobs
+    # --------------------
+    def blob_path(self, sha256: str) -> str:
+        return os.path.join(self.blob_dir, sha256[:2], f"{sha256}.pdf")
+
+    def _incoming_path(self, arxiv_id: str) -> str:
+        # Stable per-paper name so an interrupted transfer can be resumed next run
+        safe = re.sub(r"[^A-Za-z0-9._-]", "_", arxiv_id)
+        return os.path.join(self.root, "incoming", f"{safe}.pdf")
+
+    def adopt_file(self, path: str, sha256: str) -> str:
+        """
+        Move a fully written file into the store under its digest and return
+        the blob path. An identical blob already on disk is kept and `path`
+        is removed.
+        """
+        dest = self.blob_path(sha256)
+        if os.path.exists(dest):
+            os.remove(path)
+            self._bump("deduplicated")
+        else:
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            os.replace(path, dest)
+        return dest
+
+    # --------------------
+    # Fetch
+    # --------------------
+    def fetch(
+        self,
+        arxiv_id: str,
+        pdf_url: str,
+        session: Optional[requests.Session] = None,
+        revalidate: Optional[bool] = None,
+    ) -> Tuple[str, int]:
+        """
+        Return (local blob path, bytes downloaded) for an arXiv PDF.
+
+        Versioned arXiv ids (…v2) are immutable, so a manifest hit is served
+        from disk without touching the network unless `revalidate` is set.
+        Otherwise the request carries If-None-Match / If-Modified-Since and a
+        304 reuses the stored blob. Transfers stream through download_to_file,
+        so they are size-capped and resume from a leftover partial file.
+        """
+        if revalidate is None:
+            revalidate = PDF_STORE_REVALIDATE
+        _, version = split_arxiv_id(arxiv_id)
+
+        entry = self.lookup(arxiv_id)
+        cached_path = self.blob_path(entry["sha256"]) if entry else None
+        if cached_path and not os.path.exists(cached_path):
+            entry, cached_path = None, None
+
+        if entry and version and not revalidate:
+            self._bump("hits")
+            return cached_path, 0
+
+        headers = {}
+        if entry:
+            if entry["etag"]:
+                headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        result = download_to_file(
+            pdf_url,
+            self._incoming_path(arxiv_id),
+            session=session,
+            headers=headers,
+            compute_sha256=True,
+        )
+        if result["not_modified"] and entry:
+            self._bump("not_modified")
+            self.touch(arxiv_id)
+            return cached_path, 0
+        if result["not_modified"]:
+            raise RuntimeError(f"Unexpected 304 for {arxiv_id} with no stored copy")
+
+        sha = result["sha256"]
+        blob = self.adopt_file(self._incoming_path(arxiv_id), sha)
+        self.record(
+            arxiv_id,
+            sha,
+            result["bytes_total"],
+            etag=result["etag"],
+            last_modified=result["last_modified"],
+            source_url=pdf_url,
+        )
+        self._bump("downloaded")
+        return blob, result["bytes_downloaded"]
+
+
+_default_store: Optional[PdfStore] = None
+
+
+def get_pdf_store() -> PdfStore:
+    global _default_store
+    if _default_store is None:
+        _default_store = PdfStore()
+    return _default_store
@@ -1,59 +1,211 @@
 import sys
 import os
-import time
 import urllib.parse
-from typing import List, Dict
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
 import feedparser
 
 import requests
 
+from app.config import ARXIV_PAGE_DELAY_S, ARXIV_PAGE_SIZE
 from app.db import get_connection
+from app.ingestion.arxiv_cache import get_arxiv_cache, make_cache_key
+from app.ingestion.download_engine import run_downloads
+from app.ingestion.pdf_store import get_pdf_store
+from app.rate_limit import TokenBucket
 
 
 ARXIV_API_URL = "http://export.arxiv.org/api/query"
 RAW_PDF_DIR = os.path.join("data", "raw_pdfs")
 os.makedirs(RAW_PDF_DIR, exist_ok=True)
 
+# Shared by every pager in this process so pages are spaced out politely
+_ARXIV_API_BUCKET = TokenBucket(rate=1.0 / max(ARXIV_PAGE_DELAY_S, 1e-3), capacity=1)
 
-def fetch_arxiv_entries(topic: str, max_results: int = 20):
+
+class ArxivFetchError(RuntimeError):
+    """An arXiv API request failed (network/HTTP error or unparseable feed)."""
+
+
+def fetch_arxiv_feed(topic: str, max_results: int = 20, start: int = 0):
     """
-    Call the arXiv API and return parsed entries using feedparser.
+    Call the arXiv API for one window of results and return the feedparser feed.
+
+    Responses go through the arXiv query cache; a hit skips the network
+    round trip (and, from memory, feed parsing) and does not count against
+    the API rate limit.
+
+    Raises ArxivFetchError when the request fails or the response is not a
+    feed, so a failure is never mistaken for an empty (exhausted) page.
     """
+    cache = get_arxiv_cache()
+    key = make_cache_key(topic, start, max_results)
+    feed = cache.get_feed(key, feedparser.parse)
+    if feed is not None:
+        print(f"[arxiv] cache hit start={start} max_results={max_results}")
+        return feed
+
     query = f"all:{topic}"
     params = {
         "search_query": query,
-        "start": 0,
+        "start": start,
         "max_results": max_results,
     }
     url = ARXIV_API_URL + "?" + urllib.parse.urlencode(params)
     print(f"[arxiv] GET {url}")
 
-    feed = feedparser.parse(url)
+    _ARXIV_API_BUCKET.acquire()
+    try:
+        resp = requests.get(url, timeout=60)
+        resp.raise_for_status()
+    except Exception as e:
+        print(f"[arxiv] Request failed: {e}")
+        raise ArxivFetchError(f"arXiv request failed: {e}") from e
+
+    feed = feedparser.parse(resp.content)
+    if feed.bozo and not feed.entries and "opensearch_totalresults" not in feed.feed:
+        raise ArxivFetchError(f"arXiv returned an unparseable feed: {feed.get('bozo_exception')}")
     if feed.bozo:
         print("[arxiv] Warning: feedparser bozo flag set (malformed feed)")
+    else:
+        cache.put(key, resp.content, feed)
+
+    return feed
+
+
+def fetch_arxiv_entries(topic: str, max_results: int = 20, start: int = 0):
+    """
+    Call the arXiv API and return parsed entries using feedparser
+    (an empty list if the request fails).
+    """
+    try:
+        return fetch_arxiv_feed(topic, max_results=max_results, start=start).entries
+    except ArxivFetchError:
+        return []
+
+
+def load_arxiv_cursor(topic: str) -> Optional[Dict]:
+    """
+    Return the saved harvest cursor for a topic, or None.
+    """
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute(
+        "SELECT next_start, total_results, completed FROM arxiv_cursors WHERE topic = ?",
+        (topic,),
+    )
+    row = cur.fetchone()
+    conn.close()
+    if not row:
+        return None
+    return {"next_start": row[0], "total_results": row[1], "completed": bool(row[2])}
 
-    return feed.entries
 
+def save_arxiv_cursor(topic: str, next_start: int, total_results: Optional[int] = None, completed: bool = False):
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute(
+        """
+        INSERT INTO arxiv_cursors (topic, next_start, total_results, completed, updated_at)
+        VALUES (?, ?, ?, ?, datetime('now'))
+        ON CONFLICT(topic) DO UPDATE SET
+            next_start = excluded.next_start,
+            total_results = COALESCE(excluded.total_results, arxiv_cursors.total_results),
+            completed = excluded.completed,
+            updated_at = excluded.updated_at
+        """,
+        (topic, next_start, total_results, int(completed)),
+    )
+    conn.commit()
+    conn.close()
 
-def download_pdf(pdf_url: str, paper_id: int, arxiv_id: str) -> str:
+
+def iter_arxiv_pages(
+    topic: str,
+    max_results: int = 20,
+    page_size: int = ARXIV_PAGE_SIZE,
+    resume: bool = True,
+) -> Iterator[Tuple[int, list]]:
     """
-    Download arXiv PDF to data/raw_pdfs and return local path.
+    Page through the arXiv API in fixed-size windows, yielding
+    (start, entries) as each page arrives.
+
+    The cursor for a topic is saved once the consumer comes back for the
+    next page, i.e. after it has finished with the current one. With
+    `resume=True` an unfinished harvest picks up from the saved offset.
+    The cursor is only marked completed when arXiv has no more results; a
+    failed request or reaching this call's `max_results` leaves it open, so
+    a later run (possibly with a larger `max_results`) continues from there.
     """
-    os.makedirs(RAW_PDF_DIR, exist_ok=True)
-    filename = f"{paper_id}_{arxiv_id}.pdf"
-    dest = os.path.join(RAW_PDF_DIR, filename)
+    page_size = max(1, page_size)
+    start = 0
+    if resume:
+        saved = load_arxiv_cursor(topic)
+        if saved and not saved["completed"] and 0 < saved["next_start"] < max_results:
+            start = saved["next_start"]
+            print(f"[arxiv] Resuming harvest for {topic!r} at start={start}")
+
+    total_results = None
+    while start < max_results:
+        window = min(page_size, max_results - start)
+
+        try:
+            feed = fetch_arxiv_feed(topic, max_results=window, start=start)
+        except ArxivFetchError:
+            print(f"[arxiv] Stopping at start={start} after a failed request (resumable).")
+            save_arxiv_cursor(topic, start, total_results, completed=False)
+            break
+        entries = feed.entries
+
+        raw_total = feed.feed.get("opensearch_totalresults")
+        if raw_total is not None and str(raw_total).isdigit():
+            total_results = int(raw_total)
+
+        yield start, entries
+
+        start += len(entries)
+        if total_results is not None:
+            exhausted = start >= total_results
+        else:
+            exhausted = len(entries) < window
+
+        if not entries and not exhausted:
+            # arXiv occasionally returns empty pages under load; keep the
+            # cursor open so the next run retries from here.
+            print(f"[arxiv] Empty page at start={start}; stopping (resumable).")
+            save_arxiv_cursor(topic, start, total_results, completed=False)
+            break
+
+        save_arxiv_cursor(topic, start, total_results, completed=exhausted)
+        if exhausted:
+            break
+
 
-    # Reuse if already downloaded
-    if os.path.exists(dest) and os.path.getsize(dest) > 0:
-        return dest
+def iter_arxiv_entries(
+    topic: str,
+    max_results: int = 20,
+    page_size: int = ARXIV_PAGE_SIZE,
+    resume: bool = True,
+):
+    """
+    Yield arXiv entries one at a time, fetching pages lazily.
+    """
+    for _, entries in iter_arxiv_pages(topic, max_results=max_results, page_size=page_size, resume=resume):
+        yield from entries
 
-    resp = requests.get(pdf_url, timeout=60)
-    resp.raise_for_status()
-    with open(dest, "wb") as f:
-        f.write(resp.content)
 
-    return dest
+def download_pdf(
+    pdf_url: str,
+    paper_id: int,
+    arxiv_id: str,
+    session: Optional[requests.Session] = None,
+) -> str:
+    """
+    Fetch an arXiv PDF into the content-addressed store and return its local path.
+    Pass a shared `session` to reuse pooled keep-alive connections.
+    """
+    local_path, _ = get_pdf_store().fetch(arxiv_id, pdf_url, session=session)
+    return local_path
 
 
 def entry_to_row(entry, topic: str) -> Dict:
@@ -100,52 +252,94 @@ def entry_to_row(entry, topic: str) -> Dict:
     }
 
 
-def insert_papers(rows: List[Dict]):
-    """
-    Insert rows into the papers table, skipping duplicates by arxiv_id.
+_INSERT_PAPER_SQL = """
+    INSERT INTO papers (title, authors, year, abstract, pdf_url, pdf_path, arxiv_id, topic)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT DO NOTHING
+"""
+
+
+def _paper_params(row: Dict) -> Tuple:
+    return (
+        row["title"],
+        row["authors"],
+        row["year"],
+        row["abstract"],
+        row["pdf_url"],
+        row["pdf_path"],
+        row["arxiv_id"],
+        row["topic"],
+    )
+
+
+def bulk_insert_papers(conn, rows: Iterable[Dict], batch_size: int = 1000) -> Tuple[int, int]:
     """
-    if not rows:
-        print("[db] No rows to insert.")
-        return
+    Insert rows with executemany, one transaction per `batch_size` rows.
 
-    conn = get_connection()
+    Duplicates (by the unique arxiv_id index) are skipped by SQLite itself,
+    so there is no per-row lookup. Returns (inserted, skipped).
+    """
     cur = conn.cursor()
-
     inserted = 0
+    skipped = 0
+    batch: List[Tuple] = []
+
+    def _flush():
+        nonlocal inserted, skipped
+        if not batch:
+            return
+        before = conn.total_changes
+        cur.executemany(_INSERT_PAPER_SQL, batch)
+        conn.commit()
+        added = conn.total_changes - before
+        inserted += added
+        skipped += len(batch) - added
+        batch.clear()
+
     for row in rows:
-        cur.execute("SELECT id FROM papers WHERE arxiv_id = ?", (row["arxiv_id"],))
-        exists = cur.fetchone()
-        if exists:
-            print(f"[db] Skipping existing paper {row['arxiv_id']} – {row['title'][:60]}...")
-            continue
-
-        cur.execute(
-            """
-            INSERT INTO papers (title, authors, year, abstract, pdf_url, pdf_path, arxiv_id, topic)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-            (
-                row["title"],
-                row["authors"],
-                row["year"],
-                row["abstract"],
-                row["pdf_url"],
-                row["pdf_path"],
-                row["arxiv_id"],
-                row["topic"],
-            ),
-        )
-        inserted += 1
+        batch.append(_paper_params(row))
+        if len(batch) >= batch_size:
+            _flush()
+    _flush()
+
+    return inserted, skipped
 
-    conn.commit()
-    conn.close()
-    print(f"[db] Inserted {inserted} new papers.")
+
+def insert_papers(rows: Iterable[Dict], batch_size: int = 1000) -> Tuple[int, int]:
+    """
+    Insert rows into the papers table, skipping duplicates by arxiv_id.
+
+    `rows` may be any iterable (e.g. a generator over an arXiv page); it is
+    consumed lazily and committed every `batch_size` rows so inserted papers
+    become visible to other readers while the stream is still running.
+
+    Returns (inserted, skipped).
+    """
+    conn = get_connection()
+    try:
+        inserted, skipped = bulk_insert_papers(conn, rows, batch_size=batch_size)
+    finally:
+        conn.close()
+
+    if not inserted and not skipped:
+        print("[db] No rows to insert.")
+    else:
+        print(f"[db] Inserted {inserted} new papers ({skipped} already present).")
+    return inserted, skipped
 
 
-def ensure_pdfs_for_topic(topic: str, polite_delay_s: float = 1.0):
+def ensure_pdfs_for_topic(
+    topic: str,
+    polite_delay_s: Optional[float] = None,
+    max_workers: Optional[int] = None,
+):
     """
     For all papers in DB with the given topic that are missing pdf_path,
     download their PDFs and update pdf_path.
+
+    Downloads run concurrently through the download engine; its per-host
+    token bucket keeps us polite to arXiv. If `polite_delay_s` is given it
+    caps the rate at one request per `polite_delay_s` seconds.
     """
     conn = get_connection()
     cur = conn.cursor()
@@ -167,32 +361,51 @@ def ensure_pdfs_for_topic(topic: str, polite_delay_s: float = 1.0):
         print("[pdf] No papers missing pdf_path for this topic.")
         return
 
-    for paper_id, arxiv_id, pdf_url in rows:
+    for _, arxiv_id, pdf_url in rows:
         if not pdf_url:
             print(f"[pdf] Missing pdf_url for {arxiv_id}, skipping.")
-            continue
-        try:
-            time.sleep(polite_delay_s)
-            local_path = download_pdf(pdf_url, paper_id, arxiv_id)
-            cur.execute("UPDATE papers SET pdf_path = ? WHERE id = ?", (local_path, paper_id))
-            conn.commit()
-            print(f"[pdf] Downloaded {arxiv_id} → {local_path}")
-        except Exception as e:
-            print(f"[pdf] Failed to download {arxiv_id}: {e}")
 
-    conn.close()
+    store = get_pdf_store()
+
+    def _fetch(session, paper_id, arxiv_id, pdf_url):
+        return store.fetch(arxiv_id, pdf_url, session=session)
+
+    def _on_done(paper_id, arxiv_id, local_path):
+        cur.execute("UPDATE papers SET pdf_path = ? WHERE id = ?", (local_path, paper_id))
+        conn.commit()
+        print(f"[pdf] Downloaded {arxiv_id} → {local_path}")
 
+    engine_kwargs = {}
+    if polite_delay_s:
+        engine_kwargs["rate_per_host"] = 1.0 / polite_delay_s
+        engine_kwargs["burst"] = 1
+    if max_workers:
+        engine_kwargs["max_workers"] = max_workers
 
-def search_papers(topic: str, max_results: int = 20):
+    try:
+        run_downloads(rows, fetch=_fetch, on_done=_on_done, **engine_kwargs)
+    finally:
+        conn.close()
+    print(f"[pdf-store] {store.summary()}")
+
+
+def search_papers(topic: str, max_results: int = 20, resume: bool = True):
     """
     High-level function: topic -> arXiv -> DB.
+
+    Pages are inserted as they arrive, so rows appear in the DB while later
+    pages are still being fetched; an interrupted harvest resumes from the
+    last completed page.
     """
     print(f"[search] Searching arXiv for topic: {topic!r}, max_results={max_results}")
-    entries = fetch_arxiv_entries(topic, max_results=max_results)
-    print(f"[search] Got {len(entries)} entries from arXiv.")
 
-    rows = [entry_to_row(e, topic=topic) for e in entries]
-    insert_papers(rows)
+    total = 0
+    for start, entries in iter_arxiv_pages(topic, max_results=max_results, resume=resume):
+        print(f"[search] Page start={start}: {len(entries)} entries")
+        insert_papers(entry_to_row(e, topic=topic) for e in entries)
+        total += len(entries)
+
+    print(f"[search] Got {total} entries from arXiv.")
     ensure_pdfs_for_topic(topic)
 
 
@@ -0,0 +1,210 @@
+"""
+Cache of raw per-page PDF text.
+
+PyMuPDF extraction is the expensive part of parsing, and its output only
+depends on the PDF bytes and the PyMuPDF version. Pages are cached under
+data/cache/pages/ as gzip JSON lines (one page per line) keyed by
+<pdf sha256>.<fitz version>, so a change to the cleaner or splitter re-runs
+only the cheap stages.
+
+Pages are written while they stream through on a miss and read back lazily
+on a hit. The cache is capped at PAGE_CACHE_MAX_MB; the least recently used
+entries (by mtime, refreshed on every hit) are evicted first.
+
+    python -m app.parsing.page_cache          # stats
+    python -m app.parsing.page_cache clear    # drop every entry
+"""
+
+import gzip
+import json
+import os
+import sys
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app.config import PAGE_CACHE_MAX_MB
+from app.parsing.parse_manifest import file_sha256
+from app.parsing.pdf_loader import fitz, iter_text_by_page
+
+
+PAGE_CACHE_DIR = os.path.join("data", "cache", "pages")
+
+# Evict down to this fraction of the cap, so a full cache doesn't rescan on every write
+_EVICT_TO = 0.9
+
+
+def fitz_version() -> str:
+    version = getattr(fitz, "VersionBind", None) or fitz.version[0]
+    return str(version)
+
+
+class PageTextCache:
+    def __init__(self, cache_dir: str = PAGE_CACHE_DIR, max_mb: float = PAGE_CACHE_MAX_MB):
+        self.cache_dir = cache_dir
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.version = fitz_version()
+        self._lock = threading.Lock()
+        self._size: Optional[int] = None  # lazily scanned, then tracked per write
+        self.stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def _path(self, sha256: str) -> str:
+        return os.path.join(self.cache_dir, sha256[:2], f"{sha256}.{self.version}.jsonl.gz")
+
+    def _read(self, path: str) -> Iterator[str]:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                yield json.loads(line)
+
+    def _write_through(self, pages: Iterable[str], path: str) -> Iterator[str]:
+        """
+        Yield pages unchanged while writing them to the cache; the entry only
+        appears once every page has been consumed.
+        """
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with gzip.open(tmp, "wt", encoding="utf-8", compresslevel=6) as f:
+                for page in pages:
+                    f.write(json.dumps(page))
+                    f.write("\n")
+                    yield page
+            os.replace(tmp, path)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+        with self._lock:
+            self.stats["writes"] += 1
+        self._account(os.path.getsize(path))
+
+    def has(self, sha256: str) -> bool:
+        return self.enabled and os.path.exists(self._path(sha256))
+
+    def store_pages(self, sha256: str, pages: Iterable[str]) -> Iterator[str]:
+        """
+        Cache pages extracted elsewhere (e.g. assembled from page-range
+        shards) while passing them through.
+        """
+        if not self.enabled:
+            return iter(pages)
+        return self._write_through(pages, self._path(sha256))
+
+    def open_pages(self, pdf_path: str, sha256: Optional[str] = None) -> Tuple[Iterator[str], bool]:
+        """
+        Page text for a PDF as a lazy iterator, plus whether it came from the
+        cache. On a miss the pages come from PyMuPDF and are cached as they go.
+        """
+        if not self.enabled:
+            return iter_text_by_page(pdf_path), False
+
+        sha256 = sha256 or file_sha256(pdf_path)
+        path = self._path(sha256)
+        try:
+            os.utime(path)  # mark as recently used
+            hit = True
+        except OSError:
+            hit = False
+
+        with self._lock:
+            self.stats["hits" if hit else "misses"] += 1
+        if hit:
+            return self._read(path), True
+        return self._write_through(iter_text_by_page(pdf_path), path), False
+
+    def _entries(self) -> List[Tuple[float, int, str]]:
+        """(mtime, size, path) for every cache entry."""
+        entries = []
+        if not os.path.isdir(self.cache_dir):
+            return entries
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith(".jsonl.gz"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue  # evicted by another process
+                entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    def _account(self, added: int):
+        with self._lock:
+            if self._size is None:
+                self._size = sum(size for _, size, _ in self._entries())
+            else:
+                self._size += added
+            if self._size <= self.max_bytes:
+                return
+            self.evict()
+
+    def evict(self):
+        """Delete least recently used entries until under the cap. Caller holds the lock."""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * _EVICT_TO
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                self.stats["evictions"] += 1
+            except OSError:
+                pass
+            total -= size
+        self._size = total
+
+    def clear(self) -> int:
+        removed = 0
+        with self._lock:
+            for _, _, path in self._entries():
+                try:
+                    os.remove(path)
+                    removed += 1
+                except OSError:
+                    pass
+            self._size = 0
+        return removed
+
+    def usage(self) -> Dict[str, int]:
+        entries = self._entries()
+        return {
+            "entries": len(entries),
+            "bytes": sum(size for _, size, _ in entries),
+            "max_bytes": self.max_bytes,
+        }
+
+    def usage_summary(self) -> str:
+        u = self.usage()
+        mb = 1024 * 1024
+        return f"entries={u['entries']}, size={u['bytes'] / mb:.1f}/{u['max_bytes'] / mb:.0f} MB, fitz={self.version}"
+
+    def summary(self) -> str:
+        """Usage plus this process's counters (parse pool workers keep their own)."""
+        with self._lock:
+            counters = (
+                f"hits={self.stats['hits']}, misses={self.stats['misses']}, "
+                f"writes={self.stats['writes']}, evictions={self.stats['evictions']}"
+            )
+        return f"{self.usage_summary()}, {counters}"
+
+
+_default_cache: Optional[PageTextCache] = None
+
+
+def get_page_cache() -> PageTextCache:
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = PageTextCache()
+    return _default_cache
+
+
+if __name__ == "__main__":
+    cache = get_page_cache()
+    if len(sys.argv) >= 2 and sys.argv[1] == "clear":
+        print(f"[page-cache] Removed {cache.clear()} entries")
+    print(f"[page-cache] {cache.summary()}")
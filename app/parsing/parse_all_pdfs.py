@@ -1,14 +1,47 @@
+import math
 import os
+import sys
 import json
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import redirect_stdout
+from typing import Dict, Iterable, List, Optional, Tuple
 
+from app.config import PARSE_CHUNK_SIZE, PARSE_SHARD_PAGES, PARSE_WORKERS
 from app.db import get_connection
-from app.parsing.pdf_loader import extract_text_by_page
-from app.parsing.text_cleaner import clean_pages
-from app.parsing.section_splitter import split_into_sections
+from app.parsing.page_cache import get_page_cache
+from app.parsing.pdf_loader import extract_page_range, page_count, page_ranges
+from app.parsing.text_cleaner import iter_clean_pages
+from app.parsing.section_splitter import iter_sections
+from app.parsing.section_index import index_parsed_papers
+from app.parsing.section_store import get_section_store, use_section_store
+from app.parsing.parse_manifest import (
+    file_fingerprint,
+    file_sha256,
+    is_up_to_date,
+    load_manifest,
+    record_parses,
+)
 
 PROCESSED_DIR = os.path.join("data", "processed")
 os.makedirs(PROCESSED_DIR, exist_ok=True)
 
+# Bump whenever loading, cleaning, splitting or the output format changes so
+# the parse manifest invalidates previously processed papers.
+PARSER_VERSION = "5"
+
+# Manifest rows (and the section-search index) are written in batches so an
+# interrupted run keeps its progress
+MANIFEST_FLUSH_EVERY = 50
+
+# (paper_id, arxiv_id, pdf_path)
+ParseJob = Tuple[int, str, str]
+
+# In-flight marker for the task that cleans, splits and writes a reassembled sharded PDF
+_ASSEMBLE = "assemble"
+
 
 def get_all_pdfs():
     conn = get_connection()
@@ -21,41 +54,453 @@ def get_all_pdfs():
     return rows
 
 
-def parse_pdf(paper_id: int, arxiv_id: str, pdf_path: str):
-    print(f"[parse] Processing {arxiv_id} from {pdf_path}")
+def write_processed_json(dest: str, paper_id: int, arxiv_id: str, sections: Iterable[Tuple[str, str]]):
+    """
+    Write the processed-paper JSON one section at a time, so the whole
+    document never has to exist as a dict. The file is written to a temp
+    name and renamed, so readers never see a partial file.
+    """
+    tmp = dest + ".tmp"
+    try:
+        with open(tmp, "w") as f:
+            f.write("{\n")
+            f.write(f'  "paper_id": {json.dumps(paper_id)},\n')
+            f.write(f'  "arxiv_id": {json.dumps(arxiv_id)},\n')
+            f.write('  "sections": {')
+            first = True
+            for name, content in sections:
+                f.write("\n" if first else ",\n")
+                f.write(f"    {json.dumps(name)}: {json.dumps(content)}")
+                first = False
+            f.write("\n  }\n}" if not first else "}\n}")
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    os.replace(tmp, dest)
+
 
-    # 1. Load PDF
-    pages = extract_text_by_page(pdf_path)
+def parse_pdf(
+    paper_id: int,
+    arxiv_id: str,
+    pdf_path: str,
+    backend: Optional[str] = None,
+    pages: Optional[Iterable[str]] = None,
+):
+    """
+    Stream a PDF through load -> clean -> split -> write.
 
-    # 2. Clean text
-    cleaned_pages = clean_pages(pages)
-    full_text = "\n".join(cleaned_pages)
+    Pages are pulled lazily (from the page-text cache, or PyMuPDF on a miss),
+    cleaned one by one and fed to the incremental splitter, and each finished
+    section is written straight to disk; peak memory is about one section
+    plus one page. Pass `pages` to supply already-extracted page text.
 
-    # 3. Split into sections
-    sections = split_into_sections(full_text)
+    `backend` (default PROCESSED_BACKEND) picks the output: a JSON file in
+    data/processed, or rows in the compressed section store. Returns the
+    file path or section-store reference.
+    """
+    print(f"[parse] Processing {arxiv_id} from {pdf_path}")
 
-    # 4. Save JSON
-    filename = f"{paper_id}_{arxiv_id}.json"
-    dest = os.path.join(PROCESSED_DIR, filename)
+    # 1. Load PDF, 2. clean text, 3. split into sections – all lazily
+    if pages is None:
+        pages, _ = get_page_cache().open_pages(pdf_path)
+    cleaned_pages = iter_clean_pages(pages)
+    sections = iter_sections(cleaned_pages)
 
-    with open(dest, "w") as f:
-        json.dump({
-            "paper_id": paper_id,
-            "arxiv_id": arxiv_id,
-            "sections": sections
-        }, f, indent=2)
+    # 4. Save JSON, or compressed rows in the section store
+    if use_section_store(backend):
+        dest = get_section_store().write_paper(paper_id, arxiv_id, sections)
+    else:
+        filename = f"{paper_id}_{arxiv_id}.json"
+        dest = os.path.join(PROCESSED_DIR, filename)
+        write_processed_json(dest, paper_id, arxiv_id, sections)
 
     print(f"[parse] Saved processed file → {dest}")
     return dest
 
 
-def parse_all():
+def _manifest_entry(job: ParseJob, fingerprint: Dict, sha: str, output: str) -> Dict:
+    paper_id, arxiv_id, pdf_path = job
+    return {
+        "paper_id": paper_id,
+        "arxiv_id": arxiv_id,
+        "pdf_path": pdf_path,
+        "pdf_sha256": sha,
+        "parser_version": PARSER_VERSION,
+        "output_path": output,
+        **fingerprint,
+    }
+
+
+def _parse_one(job: ParseJob, shard_pages: int = 0) -> Dict:
+    """
+    Parse a single PDF, capturing any error in the result instead of raising.
+    Only small values (ids, paths, hashes, timings, error text) are returned.
+
+    With `shard_pages` > 0, an uncached PDF longer than that is not parsed
+    here: the result carries "num_pages" instead, and the caller extracts
+    page ranges in parallel (see _parse_parallel).
+    """
+    paper_id, arxiv_id, pdf_path = job
+    started = time.perf_counter()
+    result = {"paper_id": paper_id, "arxiv_id": arxiv_id, "output": None, "error": None}
+    try:
+        # Fingerprint before parsing so a file replaced mid-parse is caught next run
+        fingerprint = file_fingerprint(pdf_path)
+        sha = file_sha256(pdf_path)
+        cache = get_page_cache()
+        if shard_pages > 0 and not cache.has(sha):
+            num_pages = page_count(pdf_path)
+            if num_pages > shard_pages:
+                result.update(num_pages=num_pages, pdf_path=pdf_path, pdf_sha256=sha, fingerprint=fingerprint)
+                result["seconds"] = time.perf_counter() - started
+                return result
+
+        pages, result["page_cache_hit"] = cache.open_pages(pdf_path, sha)
+        result["output"] = parse_pdf(paper_id, arxiv_id, pdf_path, pages=pages)
+        result["manifest"] = _manifest_entry(job, fingerprint, sha, result["output"])
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["seconds"] = time.perf_counter() - started
+    return result
+
+
+def _parse_chunk(jobs: List[ParseJob], shard_pages: int = 0) -> List[Dict]:
+    """
+    Process-pool entry point. Worker logs go to the real stdout rather than
+    whatever the parent had redirected (e.g. the Streamlit log writer).
+    """
+    with redirect_stdout(sys.__stdout__):
+        return [_parse_one(job, shard_pages) for job in jobs]
+
+
+def _parse_assembled(shard: Dict) -> Dict:
+    """
+    Process-pool entry point: clean, split and write a sharded PDF once every
+    page range is back; the pages also go into the page-text cache. Runs in
+    a worker so the dispatch loop never blocks on it, and the parent only
+    holds a sharded PDF's pages until they are handed over.
+    """
+    paper_id, arxiv_id, pdf_path = shard["job"]
+    result = {
+        "paper_id": paper_id,
+        "arxiv_id": arxiv_id,
+        "output": None,
+        "error": None,
+        "page_cache_hit": False,
+        "shards": len(shard["parts"]),
+    }
+    started = time.perf_counter()
+    try:
+        with redirect_stdout(sys.__stdout__):
+            pages = (page for part in shard["parts"] for page in part)
+            pages = get_page_cache().store_pages(shard["sha"], pages)
+            result["output"] = parse_pdf(paper_id, arxiv_id, pdf_path, pages=pages)
+        result["manifest"] = _manifest_entry(shard["job"], shard["fingerprint"], shard["sha"], result["output"])
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["seconds"] = shard["elapsed"] + time.perf_counter() - started
+    return result
+
+
+def _report(result: Dict, results: List[Dict], pending_manifest: List[Dict]):
+    results.append(result)
+    if result["error"]:
+        print(f"[parse] FAILED {result['arxiv_id']}: {result['error']}")
+        return
+
+    pending_manifest.append(result.pop("manifest"))
+    if len(pending_manifest) >= MANIFEST_FLUSH_EVERY:
+        _flush_manifest(pending_manifest)
+
+
+def _flush_manifest(pending_manifest: List[Dict]):
+    """
+    Index the batch's sections for search, then record it in the manifest
+    (in that order, so a paper is never marked parsed without being indexed).
+    """
+    index_parsed_papers(pending_manifest)
+    record_parses(pending_manifest)
+    pending_manifest.clear()
+
+
+def _file_size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def schedule_chunks(rows: List[ParseJob], chunk_size: int) -> List[List[ParseJob]]:
+    """
+    Largest PDFs first, so the longest jobs start early instead of straggling
+    at the end of the run. A chunk takes up to `chunk_size` PDFs but is closed
+    as soon as it holds as many bytes as the largest PDF, so big files travel
+    alone and small ones are batched.
+    """
+    sized = sorted(((_file_size(row[2]), row) for row in rows), key=lambda x: x[0], reverse=True)
+    largest = sized[0][0] if sized else 0
+    chunks: List[List[ParseJob]] = []
+    chunk: List[ParseJob] = []
+    chunk_bytes = 0
+    for size, row in sized:
+        chunk.append(row)
+        chunk_bytes += size
+        if len(chunk) >= chunk_size or (largest and chunk_bytes >= largest):
+            chunks.append(chunk)
+            chunk, chunk_bytes = [], 0
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+def _parse_parallel(
+    rows: List[ParseJob],
+    workers: int,
+    chunk_size: int,
+    pending_manifest: List[Dict],
+    shard_pages: int = 0,
+) -> List[Dict]:
+    """
+    Fan chunks of PDFs out to a process pool, biggest first, keeping at most
+    2 tasks per worker in flight.
+
+    A worker that finds an uncached PDF longer than `shard_pages` hands it
+    back; its page ranges are then extracted as separate pool tasks (each
+    opening the file on its own), collected in order here and handed to one
+    more task that cleans, splits and writes the paper, so one huge PDF
+    doesn't keep a single worker busy long after the rest are idle.
+
+    If a worker process dies (e.g. a native crash inside PyMuPDF) every
+    in-flight task is lost with the pool. The pool is rebuilt and those PDFs
+    are retried one at a time, unsharded, in isolation, so only the PDF that
+    actually crashes is reported as failed.
+    """
+    queue = deque(schedule_chunks(rows, chunk_size))
+    suspects: deque = deque()
+    max_in_flight = workers * 2
+    results: List[Dict] = []
+    sharded: Dict[int, Dict] = {}  # paper_id -> page ranges being extracted
+
+    pool = ProcessPoolExecutor(max_workers=workers)
+    in_flight = {}  # future -> (jobs, shard index or None)
+
+    def _start_shards(probe: Dict):
+        job = (probe["paper_id"], probe["arxiv_id"], probe["pdf_path"])
+        ranges = page_ranges(probe["num_pages"], workers)
+        print(f"[parse] Sharding {probe['arxiv_id']}: {probe['num_pages']} pages in {len(ranges)} ranges")
+        sharded[job[0]] = {
+            "job": job,
+            "sha": probe["pdf_sha256"],
+            "fingerprint": probe["fingerprint"],
+            "parts": [None] * len(ranges),
+            "remaining": len(ranges),
+            "probe_seconds": probe["seconds"],
+            "started": time.perf_counter(),
+        }
+        for i, (start, stop) in enumerate(ranges):
+            in_flight[pool.submit(extract_page_range, job[2], start, stop)] = ([job], i)
+
+    try:
+        while queue or suspects or in_flight:
+            if suspects:
+                # Isolation mode: exactly one suspect PDF in flight at a time
+                if not in_flight:
+                    job = suspects.popleft()
+                    in_flight[pool.submit(_parse_chunk, [job])] = ([job], None)
+            else:
+                while queue and len(in_flight) < max_in_flight:
+                    chunk = queue.popleft()
+                    in_flight[pool.submit(_parse_chunk, chunk, shard_pages)] = (chunk, None)
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            broken = False
+            for fut in done:
+                chunk, shard_index = in_flight.pop(fut)
+                try:
+                    if shard_index == _ASSEMBLE:
+                        _report(fut.result(), results, pending_manifest)
+                        continue
+                    if shard_index is None:
+                        for result in fut.result():
+                            if result.get("num_pages"):
+                                _start_shards(result)
+                            else:
+                                _report(result, results, pending_manifest)
+                        continue
+
+                    paper_id = chunk[0][0]
+                    shard = sharded.get(paper_id)
+                    if shard is None:
+                        continue  # another range of this PDF already failed
+                    try:
+                        shard["parts"][shard_index] = fut.result()
+                    except BrokenProcessPool:
+                        raise
+                    except Exception as e:
+                        del sharded[paper_id]
+                        _report({
+                            "paper_id": paper_id,
+                            "arxiv_id": chunk[0][1],
+                            "output": None,
+                            "error": f"{type(e).__name__}: {e}",
+                            "seconds": time.perf_counter() - shard["started"],
+                        }, results, pending_manifest)
+                        continue
+                    shard["remaining"] -= 1
+                    if shard["remaining"] == 0:
+                        del sharded[paper_id]
+                        shard["elapsed"] = shard.pop("probe_seconds") + time.perf_counter() - shard.pop("started")
+                        in_flight[pool.submit(_parse_assembled, shard)] = (chunk, _ASSEMBLE)
+                except BrokenProcessPool:
+                    broken = True
+                    if shard_index == _ASSEMBLE:
+                        suspects.extend(chunk)
+                    elif shard_index is not None:
+                        # A dead page-range task sends the whole PDF to isolation (once)
+                        if sharded.pop(chunk[0][0], None) is not None:
+                            suspects.extend(chunk)
+                    # Only convict a PDF that was running alone when the pool died
+                    elif len(chunk) == 1 and len(done) == 1 and not in_flight:
+                        paper_id, arxiv_id, _ = chunk[0]
+                        _report({
+                            "paper_id": paper_id,
+                            "arxiv_id": arxiv_id,
+                            "output": None,
+                            "error": "worker process crashed",
+                            "seconds": 0.0,
+                        }, results, pending_manifest)
+                    else:
+                        suspects.extend(chunk)
+
+            if broken:
+                # Everything still in flight died with the pool
+                for chunk, shard_index in in_flight.values():
+                    if shard_index is None or shard_index == _ASSEMBLE:
+                        suspects.extend(chunk)
+                    elif sharded.pop(chunk[0][0], None) is not None:
+                        suspects.extend(chunk)
+                in_flight.clear()
+                pool.shutdown(wait=False, cancel_futures=True)
+                pool = ProcessPoolExecutor(max_workers=workers)
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+    return results
+
+
+def _output_exists_checker():
+    """
+    Existence check for manifest output paths. Section-store references
+    ("<store>#<paper_id>") are resolved against one query of stored ids;
+    anything else is a file path. An output in the other backend counts as
+    missing, so switching PROCESSED_BACKEND re-parses into the new one.
+    """
+    store = get_section_store()
+    if not use_section_store():
+        return lambda ref: store.paper_id_from_ref(ref) is None and os.path.exists(ref)
+
+    stored = store.paper_ids()
+    return lambda ref: store.paper_id_from_ref(ref) in stored
+
+
+def select_papers_to_parse(rows: List[ParseJob], force: bool = False) -> List[ParseJob]:
+    """
+    Drop papers whose PDF and parser version match the parse manifest.
+    The manifest is loaded once, so each check is a dict lookup plus stat().
+    """
+    if force:
+        return list(rows)
+
+    manifest = load_manifest()
+    output_exists = _output_exists_checker()
+    todo: List[ParseJob] = []
+    refreshed: List[Dict] = []
+    for paper_id, arxiv_id, pdf_path in rows:
+        kept = is_up_to_date(manifest.get(paper_id), arxiv_id, pdf_path, PARSER_VERSION, output_exists)
+        if kept is None:
+            todo.append((paper_id, arxiv_id, pdf_path))
+        elif kept.get("_refreshed"):
+            refreshed.append(kept)
+
+    record_parses(refreshed)
+    skipped = len(rows) - len(todo)
+    if skipped:
+        print(f"[parse] Skipping {skipped} unchanged PDFs (parser v{PARSER_VERSION}).")
+    return todo
+
+
+def _count_shards(rows: List[ParseJob], shard_pages: int) -> int:
+    """
+    Upper bound on the pool tasks a run can use at once: one per PDF, or
+    ceil(pages / shard_pages) for a PDF longer than `shard_pages`. Opens each
+    PDF only to read its page count; unreadable ones count as one.
+    """
+    total = 0
+    for _, _, pdf_path in rows:
+        try:
+            num_pages = page_count(pdf_path)
+        except Exception:
+            num_pages = 0
+        total += math.ceil(num_pages / shard_pages) if num_pages > shard_pages else 1
+    return total
+
+
+def parse_all(
+    workers: Optional[int] = None,
+    chunk_size: Optional[int] = None,
+    force: bool = False,
+    shard_pages: Optional[int] = None,
+) -> List[Dict]:
+    """
+    Parse every downloaded PDF that changed since it was last parsed
+    (or all of them with `force=True`).
+
+    With `workers` > 1 (default PARSE_WORKERS) PDFs are parsed in a process
+    pool, `chunk_size` PDFs per task, largest files first. PDFs with more than
+    `shard_pages` pages (default PARSE_SHARD_PAGES, 0 disables) are split into
+    page ranges across the pool. A failing PDF is reported and skipped; it
+    never aborts the batch. Returns one small result dict per parsed PDF.
+    """
     rows = get_all_pdfs()
     print(f"[parse] Found {len(rows)} PDFs to process.")
+    rows = select_papers_to_parse(rows, force=force)
+    if not rows:
+        return []
 
-    for paper_id, arxiv_id, pdf_path in rows:
-        parse_pdf(paper_id, arxiv_id, pdf_path)
+    shard_pages = PARSE_SHARD_PAGES if shard_pages is None else shard_pages
+    workers = max(1, workers or PARSE_WORKERS)
+    if shard_pages <= 0:
+        # Without sharding a PDF never uses more than one worker
+        workers = min(workers, len(rows))
+    elif workers > len(rows):
+        # Fewer PDFs than workers: only start as many processes as there are shards
+        workers = min(workers, _count_shards(rows, shard_pages))
+    chunk_size = max(1, chunk_size or PARSE_CHUNK_SIZE)
+    started = time.perf_counter()
+    pending_manifest: List[Dict] = []
+
+    try:
+        if workers == 1:
+            results: List[Dict] = []
+            for row in rows:
+                _report(_parse_one(row), results, pending_manifest)
+        else:
+            print(f"[parse] Using {workers} worker processes, {chunk_size} PDFs per task")
+            results = _parse_parallel(rows, workers, chunk_size, pending_manifest, shard_pages)
+    finally:
+        _flush_manifest(pending_manifest)
+
+    failed = sum(1 for r in results if r["error"])
+    elapsed = time.perf_counter() - started
+    print(f"[parse] Parsed {len(results) - failed} PDFs ({failed} failed) in {elapsed:.1f}s")
+
+    cache = get_page_cache()
+    if cache.enabled:
+        hits = sum(1 for r in results if r.get("page_cache_hit"))
+        print(f"[page-cache] {hits}/{len(results)} PDFs served from cache; {cache.usage_summary()}")
+    return results
 
 
 if __name__ == "__main__":
-    parse_all()
\ No newline at end of file
+    parse_all()
@@ -0,0 +1,129 @@
+"""
+Incremental-parse manifest.
+
+One row per paper in the `parse_manifest` table records which PDF bytes
+(size, mtime, SHA-256) were parsed by which parser version and where the
+output went. parse_all loads the whole manifest with a single query and
+skips a paper when nothing relevant changed:
+
+- fast path: same parser version, same path, same size + mtime, output
+  still present -> skip on a couple of stat() calls, no hashing
+- slow path: size/mtime changed -> hash the PDF; identical content is
+  still skipped (and the stat fingerprint refreshed)
+"""
+
+import hashlib
+import os
+from typing import Callable, Dict, Iterable, Optional
+
+from app.db import get_connection
+
+
+def file_sha256(path: str, chunk_size: int = 1024 * 1024) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def file_fingerprint(path: str) -> Dict:
+    st = os.stat(path)
+    return {"pdf_size": st.st_size, "pdf_mtime_ns": st.st_mtime_ns}
+
+
+def load_manifest() -> Dict[int, Dict]:
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute(
+        """
+        SELECT paper_id, arxiv_id, pdf_path, pdf_size, pdf_mtime_ns, pdf_sha256, parser_version, output_path
+        FROM parse_manifest
+        """
+    )
+    cols = [d[0] for d in cur.description]
+    manifest = {row[0]: dict(zip(cols, row)) for row in cur.fetchall()}
+    conn.close()
+    return manifest
+
+
+def record_parses(entries: Iterable[Dict]):
+    """
+    Upsert manifest rows. Each entry needs every manifest column except parsed_at.
+    """
+    rows = [
+        (
+            e["paper_id"], e["arxiv_id"], e["pdf_path"], e["pdf_size"], e["pdf_mtime_ns"],
+            e["pdf_sha256"], e["parser_version"], e["output_path"],
+        )
+        for e in entries
+    ]
+    if not rows:
+        return
+
+    conn = get_connection()
+    conn.executemany(
+        """
+        INSERT INTO parse_manifest (
+            paper_id, arxiv_id, pdf_path, pdf_size, pdf_mtime_ns, pdf_sha256, parser_version, output_path, parsed_at
+        )
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, datetime('now'))
+        ON CONFLICT(paper_id) DO UPDATE SET
+            arxiv_id = excluded.arxiv_id,
+            pdf_path = excluded.pdf_path,
+            pdf_size = excluded.pdf_size,
+            pdf_mtime_ns = excluded.pdf_mtime_ns,
+            pdf_sha256 = excluded.pdf_sha256,
+            parser_version = excluded.parser_version,
+            output_path = excluded.output_path,
+            parsed_at = excluded.parsed_at
+        """,
+        rows,
+    )
+    conn.commit()
+    conn.close()
+
+
+def is_up_to_date(
+    entry: Optional[Dict],
+    arxiv_id: str,
+    pdf_path: str,
+    parser_version: str,
+    output_exists: Callable[[str], bool] = os.path.exists,
+) -> Optional[Dict]:
+    """
+    Decide whether a paper can be skipped.
+
+    Returns None if it must be (re)parsed, otherwise the manifest entry to
+    keep. A returned entry may carry a refreshed stat fingerprint, in which
+    case the caller should write it back. `output_exists` checks the recorded
+    output_path (a file path, or a section-store reference).
+    """
+    if not entry:
+        return None
+    if entry["parser_version"] != parser_version or entry["arxiv_id"] != arxiv_id:
+        return None
+    if not entry["output_path"] or not output_exists(entry["output_path"]):
+        return None
+
+    try:
+        fp = file_fingerprint(pdf_path)
+    except OSError:
+        return None
+
+    if (
+        entry["pdf_path"] == pdf_path
+        and entry["pdf_size"] == fp["pdf_size"]
+        and entry["pdf_mtime_ns"] == fp["pdf_mtime_ns"]
+    ):
+        return entry
+
+    # Moved or touched: only the content hash can tell
+    if entry["pdf_size"] != fp["pdf_size"] or file_sha256(pdf_path) != entry["pdf_sha256"]:
+        return None
+
+    refreshed = dict(entry)
+    refreshed.update(fp)
+    refreshed["pdf_path"] = pdf_path
+    refreshed["_refreshed"] = True
+    return refreshed
@@ -1,3 +1,5 @@
+from typing import Iterator, List, Tuple
+
 try:
     import fitz  # PyMuPDF
 except Exception as e:
@@ -7,21 +9,67 @@ except Exception as e:
     ) from e
 
 
-def extract_text_by_page(pdf_path: str):
-    """
-    Return list of strings, one per page.
-    """
+def _check_fitz():
     if not hasattr(fitz, "open"):
         raise RuntimeError(
             "Incorrect fitz module loaded. "
             "Expected PyMuPDF with fitz.open()."
         )
 
+
+def iter_text_by_page(pdf_path: str) -> Iterator[str]:
+    """
+    Yield page text one page at a time; PyMuPDF loads each page lazily,
+    so only the current page is held in memory.
+    """
+    _check_fitz()
+
+    doc = fitz.open(pdf_path)
+    try:
+        for page in doc:
+            yield page.get_text("text")
+    finally:
+        doc.close()
+
+
+def page_count(pdf_path: str) -> int:
+    _check_fitz()
+
     doc = fitz.open(pdf_path)
-    pages = []
+    try:
+        return doc.page_count
+    finally:
+        doc.close()
 
-    for page in doc:
-        pages.append(page.get_text("text"))
 
-    doc.close()
-    return pages
\ No newline at end of file
+def extract_page_range(pdf_path: str, start: int, stop: int) -> List[str]:
+    """
+    Text of pages [start, stop). Each call opens its own read-only handle,
+    so ranges of one document can be extracted in separate processes.
+    """
+    _check_fitz()
+
+    doc = fitz.open(pdf_path)
+    try:
+        return [doc[i].get_text("text") for i in range(start, min(stop, doc.page_count))]
+    finally:
+        doc.close()
+
+
+def page_ranges(num_pages: int, num_shards: int) -> List[Tuple[int, int]]:
+    """Split [0, num_pages) into at most num_shards contiguous, near-equal ranges."""
+    num_shards = max(1, min(num_shards, num_pages))
+    size, extra = divmod(num_pages, num_shards)
+    ranges, start = [], 0
+    for i in range(num_shards):
+        stop = start + size + (1 if i < extra else 0)
+        ranges.append((start, stop))
+        start = stop
+    return ranges
+
+
+def extract_text_by_page(pdf_path: str):
+    """
+    Return list of strings, one per page.
+    """
+    return list(iter_text_by_page(pdf_path))
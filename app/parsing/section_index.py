@@ -0,0 +1,180 @@
+"""
+Full-text search over parsed paper sections.
+
+parse_all copies every parsed section into the `paper_sections` table; an
+external-content FTS5 table (`paper_sections_fts`, created in init_db and kept
+in sync by triggers) indexes it. search_sections() answers a free-text query
+with papers ranked by their best-matching section (BM25) plus highlighted
+snippets.
+
+    python -m app.parsing.section_index "prompt injection defense"
+    python -m app.parsing.section_index --rebuild     # re-index every parsed paper
+"""
+
+import json
+import re
+import sqlite3
+import sys
+import time
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from app.db import get_connection
+from app.parsing.section_store import get_section_store
+
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def iter_output_sections(output_path: str) -> Iterator[Tuple[str, str]]:
+    """Sections of a processed paper, from a JSON file or a section-store reference."""
+    store = get_section_store()
+    paper_id = store.paper_id_from_ref(output_path)
+    if paper_id is not None:
+        yield from store.iter_sections(paper_id)
+        return
+
+    with open(output_path, "r") as f:
+        yield from json.load(f)["sections"].items()
+
+
+def index_paper(conn, paper_id: int, sections: Iterable[Tuple[str, str]]) -> int:
+    """Replace a paper's rows in paper_sections (the FTS index follows via triggers)."""
+    conn.execute("DELETE FROM paper_sections WHERE paper_id = ?", (paper_id,))
+    cur = conn.executemany(
+        "INSERT INTO paper_sections (paper_id, ordinal, name, content) VALUES (?, ?, ?, ?)",
+        ((paper_id, ordinal, name, content) for ordinal, (name, content) in enumerate(sections)),
+    )
+    return cur.rowcount
+
+
+def index_parsed_papers(entries: Iterable[Dict]) -> int:
+    """
+    Index a batch of freshly parsed papers (parse-manifest entries: paper_id +
+    output_path) in one transaction. Returns the number of sections written.
+    """
+    entries = list(entries)
+    if not entries:
+        return 0
+
+    conn = get_connection()
+    written = 0
+    try:
+        with conn:
+            for e in entries:
+                try:
+                    written += index_paper(conn, e["paper_id"], iter_output_sections(e["output_path"]))
+                except (OSError, ValueError, KeyError) as err:
+                    print(f"[index] Could not index paper_id={e['paper_id']}: {err}")
+    finally:
+        conn.close()
+    return written
+
+
+def rebuild_section_index() -> int:
+    """Re-index every paper in the parse manifest from its processed output."""
+    conn = get_connection()
+    entries = [
+        {"paper_id": r[0], "output_path": r[1]}
+        for r in conn.execute("SELECT paper_id, output_path FROM parse_manifest WHERE output_path IS NOT NULL")
+    ]
+    conn.close()
+
+    written = index_parsed_papers(entries)
+    print(f"[index] Indexed {written} sections from {len(entries)} papers.")
+    return written
+
+
+def to_fts_query(text: str) -> str:
+    """
+    Free text -> FTS5 query: every word must match (implicit AND), each word
+    quoted so punctuation and FTS operators in user input are inert.
+    """
+    return " ".join(f'"{tok}"' for tok in _TOKEN_RE.findall(text))
+
+
+def search_sections(query: str, limit: int = 20, snippets_per_paper: int = 3) -> List[Dict]:
+    """
+    Rank papers by their best-matching section (BM25; lower is better) and
+    return up to `limit` of them, each with title, score, number of matching
+    sections and up to `snippets_per_paper` highlighted snippets.
+    """
+    fts_query = to_fts_query(query)
+    if not fts_query:
+        return []
+
+    conn = get_connection()
+    try:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            WITH hits AS (
+                -- bm25() only works while the FTS table drives the query; the
+                -- LIMIT keeps SQLite from flattening this into the join below
+                -- (same effect as AS MATERIALIZED, which needs SQLite >= 3.35)
+                SELECT rowid, bm25(paper_sections_fts) AS score
+                FROM paper_sections_fts
+                WHERE paper_sections_fts MATCH ?
+                LIMIT -1 OFFSET 0
+            )
+            SELECT s.paper_id, p.arxiv_id, p.title, min(h.score) AS best, count(*) AS matches
+            FROM hits h
+            JOIN paper_sections s ON s.id = h.rowid
+            LEFT JOIN papers p ON p.id = s.paper_id
+            GROUP BY s.paper_id
+            ORDER BY best
+            LIMIT ?
+            """,
+            (fts_query, limit),
+        )
+        papers = [
+            {"paper_id": r[0], "arxiv_id": r[1], "title": r[2], "score": r[3], "matches": r[4], "snippets": []}
+            for r in cur.fetchall()
+        ]
+        if not papers or snippets_per_paper <= 0:
+            return papers
+
+        by_id = {p["paper_id"]: p for p in papers}
+        placeholders = ",".join("?" for _ in by_id)
+        cur.execute(
+            f"""
+            SELECT s.paper_id, s.name, snippet(paper_sections_fts, 1, '[', ']', ' … ', 16)
+            FROM paper_sections_fts
+            JOIN paper_sections s ON s.id = paper_sections_fts.rowid
+            WHERE paper_sections_fts MATCH ? AND s.paper_id IN ({placeholders})
+            ORDER BY bm25(paper_sections_fts)
+            """,
+            (fts_query, *by_id),
+        )
+        for paper_id, name, snippet in cur.fetchall():
+            snippets = by_id[paper_id]["snippets"]
+            if len(snippets) < snippets_per_paper:
+                snippets.append({"section": name, "snippet": snippet})
+    except sqlite3.OperationalError as e:
+        print(f"[index] Section search unavailable: {e}")
+        return []
+    finally:
+        conn.close()
+
+    return papers
+
+
+def search_paper_ids(query: str, limit: int = 50) -> List[int]:
+    """Paper ids for a content query, best match first."""
+    return [p["paper_id"] for p in search_sections(query, limit=limit, snippets_per_paper=0)]
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 2 and sys.argv[1] == "--rebuild":
+        rebuild_section_index()
+    elif len(sys.argv) >= 2:
+        started = time.perf_counter()
+        results = search_sections(" ".join(sys.argv[1:]))
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        for rank, paper in enumerate(results, 1):
+            print(f"{rank:2d}. [{paper['arxiv_id']}] {paper['title']}  (bm25={paper['score']:.2f}, {paper['matches']} sections)")
+            for s in paper["snippets"]:
+                print(f"      {s['section']}: {s['snippet']}")
+        print(f"[index] {len(results)} papers in {elapsed_ms:.1f} ms")
+    else:
+        print('Usage: python -m app.parsing.section_index "<query>" | --rebuild')
+        raise SystemExit(1)
@@ -1,4 +1,5 @@
 import re
+from typing import Container, Iterable, Iterator, List, Optional, Tuple
 
 SECTION_HEADERS = [
     "abstract",
@@ -17,31 +18,108 @@ SECTION_HEADERS = [
     "future work"
 ]
 
-def split_into_sections(full_text: str):
+# Words allowed after the header keyword on a heading line, besides
+# Capitalized / UPPER / numeric words ("Results and Discussion", "Method Overview")
+_CONNECTORS = {"and", "of", "for", "the", "in", "on", "with", "to", "a", "an", "&", "/", "-"}
+_MAX_EXTRA_WORDS = 5
+
+# One precompiled, line-anchored alternation over all headers (longest first so
+# "methodology" wins over "method"). Optional numbering: "3", "3.2", "III", "A", with "." or ")".
+HEADER_LINE_RE = re.compile(
+    r"^[ \t]*"
+    r"(?:(?:\d{1,2}(?:\.\d{1,2})*|[IVX]{1,5}|[A-H])[.)]?[ \t]+)?"
+    r"(?P<header>" + "|".join(re.escape(h) for h in sorted(SECTION_HEADERS, key=len, reverse=True)) + r")s?"
+    r"(?P<rest>(?:[ \t]+[^\s.,;!?]+){0," + str(_MAX_EXTRA_WORDS) + r"})"
+    r"[ \t]*:?[ \t]*$",
+    re.IGNORECASE | re.MULTILINE,
+)
+
+
+def _is_heading(match: "re.Match") -> bool:
     """
-    Split paper text into sections based on common academic headers.
-    Returns a dict: {section_name: content}
+    Reject body lines that merely start with a header word
+    ("results in Table 3 show ...") by requiring heading-style casing.
     """
+    if not match.group("header")[0].isupper():
+        return False
+    for word in match.group("rest").split():
+        if word.lower() in _CONNECTORS:
+            continue
+        if not (word[0].isupper() or word[0].isdigit()):
+            return False
+    return True
+
 
-    text = full_text.lower()
+def unique_section_name(name: str, taken: Container[str]) -> str:
+    """'results' -> 'results_2' if 'results' is already taken, and so on."""
+    if name not in taken:
+        return name
+    n = 2
+    while f"{name}_{n}" in taken:
+        n += 1
+    return f"{name}_{n}"
 
-    pattern = r"(?=(" + "|".join([re.escape(h) for h in SECTION_HEADERS]) + r"))"
 
-    # Find all header occurrences (positions)
-    matches = list(re.finditer(pattern, text))
+def iter_sections(chunks: Iterable[str]) -> Iterator[Tuple[str, str]]:
+    """
+    Incremental splitter: consume text chunks (e.g. cleaned pages, each made
+    of whole lines, joined as if by "\n") and yield (section_name, content)
+    as soon as each section is complete.
 
-    if not matches:
-        # fallback: return entire text as "full_text"
-        return {"full_text": full_text}
+    Only the section currently being assembled is held in memory, so peak
+    memory is bounded by the largest section rather than the document.
+    Produces the same sections, in the same order, as split_into_sections.
+    """
+    taken = set()
+    current: Optional[str] = None  # None = front matter (before any heading)
+    parts: List[str] = []
+    saw_heading = False
 
-    sections = {}
-    for i, match in enumerate(matches):
-        header = match.group(0)
-        start = match.start()
+    def _finish() -> Optional[Tuple[str, str]]:
+        content = "\n".join(parts).strip()
+        if current is None:
+            if not content:
+                return None
+            name = "front_matter"
+        else:
+            name = current
+        name = unique_section_name(name, taken)
+        taken.add(name)
+        return name, content
 
-        end = matches[i + 1].start() if i + 1 < len(matches) else len(text)
-        content = full_text[start:end].strip()
+    for chunk in chunks:
+        pos = 0
+        for m in HEADER_LINE_RE.finditer(chunk):
+            if not _is_heading(m):
+                continue
+            parts.append(chunk[pos:m.start()])
+            done = _finish()
+            if done:
+                yield done
+            saw_heading = True
+            current = m.group("header").lower()
+            parts = []
+            pos = m.start()
+        parts.append(chunk[pos:])
 
-        sections[header] = content
+    if not saw_heading:
+        # fallback: the entire text as "full_text"
+        yield "full_text", "\n".join(parts)
+        return
 
-    return sections
\ No newline at end of file
+    done = _finish()
+    if done:
+        yield done
+
+
+def split_into_sections(full_text: str):
+    """
+    Split paper text into sections based on common academic headers.
+    Returns a dict: {section_name: content}
+
+    Only line-anchored headings count (optionally numbered, e.g. "3 Experiments"
+    or "IV. RESULTS"). Sections keep document order; a repeated header gets a
+    numeric suffix instead of overwriting the earlier one. Text before the first
+    heading is kept as "front_matter".
+    """
+    return dict(iter_sections([full_text]))
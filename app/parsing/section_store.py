@@ -0,0 +1,200 @@
+"""
+Compact storage backend for processed papers.
+
+Instead of one indented JSON file per paper, all section text lives in a single
+SQLite file (data/processed/sections.db): one row per section, zlib-compressed,
+keyed by (paper_id, ordinal). SQLite's B-tree is the offset index, and reads go
+through memory-mapped I/O (PRAGMA mmap_size), so a single section can be read
+and decompressed without touching the rest of the paper.
+
+Selected with PROCESSED_BACKEND=sqlite; the JSON files remain the default.
+"""
+
+import os
+import sqlite3
+import zlib
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from app.config import PROCESSED_BACKEND
+
+
+SECTION_STORE_PATH = os.path.join("data", "processed", "sections.db")
+
+_MMAP_BYTES = 256 * 1024 * 1024
+_COMPRESS_LEVEL = 6
+
+
+def _compress(text: str) -> bytes:
+    return zlib.compress(text.encode("utf-8"), _COMPRESS_LEVEL)
+
+
+def _decompress(blob: bytes) -> str:
+    return zlib.decompress(blob).decode("utf-8")
+
+
+class SectionStore:
+    def __init__(self, path: str = SECTION_STORE_PATH):
+        self.path = path
+
+    def _connect(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        # Parse workers write concurrently; WAL + a generous timeout serialises them
+        conn = sqlite3.connect(self.path, timeout=60)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA mmap_size={_MMAP_BYTES}")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS processed_papers (
+                paper_id INTEGER PRIMARY KEY,
+                arxiv_id TEXT,
+                num_sections INTEGER,
+                raw_bytes INTEGER,
+                stored_bytes INTEGER,
+                written_at TEXT DEFAULT (datetime('now'))
+            );
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS processed_sections (
+                paper_id INTEGER NOT NULL,
+                ordinal INTEGER NOT NULL,
+                name TEXT NOT NULL,
+                raw_len INTEGER,
+                body BLOB,
+                PRIMARY KEY (paper_id, ordinal)
+            ) WITHOUT ROWID;
+        """)
+        return conn
+
+    def ref(self, paper_id: int) -> str:
+        """Output reference recorded in the parse manifest, e.g. data/processed/sections.db#12."""
+        return f"{self.path}#{paper_id}"
+
+    def paper_id_from_ref(self, ref: str) -> Optional[int]:
+        """Inverse of ref(); None for anything that isn't a reference into this store."""
+        prefix = self.ref("")
+        if ref.startswith(prefix) and ref[len(prefix):].isdigit():
+            return int(ref[len(prefix):])
+        return None
+
+    def write_paper(self, paper_id: int, arxiv_id: str, sections: Iterable[Tuple[str, str]]) -> str:
+        """
+        Replace a paper's sections, compressing each one as it arrives from
+        the (possibly lazy) `sections` iterator.
+
+        The iterator is drained before the database is touched: it may still
+        be extracting and cleaning the PDF, and holding the write lock
+        meanwhile would stall every other parse worker. Only the compressed
+        rows are kept in memory, then written in one short transaction.
+        """
+        rows = []
+        raw_total = stored_total = 0
+        for ordinal, (name, content) in enumerate(sections):
+            body = _compress(content)
+            rows.append((paper_id, ordinal, name, len(content), body))
+            raw_total += len(content)
+            stored_total += len(body)
+
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("DELETE FROM processed_sections WHERE paper_id = ?", (paper_id,))
+                conn.executemany(
+                    "INSERT INTO processed_sections (paper_id, ordinal, name, raw_len, body) VALUES (?, ?, ?, ?, ?)",
+                    rows,
+                )
+                conn.execute(
+                    """
+                    INSERT OR REPLACE INTO processed_papers (paper_id, arxiv_id, num_sections, raw_bytes, stored_bytes)
+                    VALUES (?, ?, ?, ?, ?)
+                    """,
+                    (paper_id, arxiv_id, len(rows), raw_total, stored_total),
+                )
+        finally:
+            conn.close()
+        return self.ref(paper_id)
+
+    def paper_ids(self) -> Set[int]:
+        if not os.path.exists(self.path):
+            return set()
+        conn = self._connect()
+        ids = {r[0] for r in conn.execute("SELECT paper_id FROM processed_papers")}
+        conn.close()
+        return ids
+
+    def list_papers(self) -> List[Tuple[int, str]]:
+        if not os.path.exists(self.path):
+            return []
+        conn = self._connect()
+        rows = conn.execute("SELECT paper_id, arxiv_id FROM processed_papers ORDER BY paper_id").fetchall()
+        conn.close()
+        return rows
+
+    def section_names(self, paper_id: int) -> List[str]:
+        """Section names in document order; no section body is read."""
+        conn = self._connect()
+        names = [r[0] for r in conn.execute(
+            "SELECT name FROM processed_sections WHERE paper_id = ? ORDER BY ordinal",
+            (paper_id,),
+        )]
+        conn.close()
+        return names
+
+    def read_section(self, paper_id: int, name: str) -> Optional[str]:
+        """Decompress a single section."""
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT body FROM processed_sections WHERE paper_id = ? AND name = ?",
+            (paper_id, name),
+        ).fetchone()
+        conn.close()
+        return _decompress(row[0]) if row else None
+
+    def iter_sections(self, paper_id: int) -> Iterator[Tuple[str, str]]:
+        conn = self._connect()
+        try:
+            for name, body in conn.execute(
+                "SELECT name, body FROM processed_sections WHERE paper_id = ? ORDER BY ordinal",
+                (paper_id,),
+            ):
+                yield name, _decompress(body)
+        finally:
+            conn.close()
+
+    def load_paper(self, paper_id: int) -> Optional[Dict]:
+        """The same shape as a data/processed/*.json file."""
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT arxiv_id FROM processed_papers WHERE paper_id = ?",
+            (paper_id,),
+        ).fetchone()
+        conn.close()
+        if not row:
+            return None
+        return {
+            "paper_id": paper_id,
+            "arxiv_id": row[0],
+            "sections": dict(self.iter_sections(paper_id)),
+        }
+
+    def stats(self) -> Dict[str, int]:
+        if not os.path.exists(self.path):
+            return {"papers": 0, "raw_bytes": 0, "stored_bytes": 0}
+        conn = self._connect()
+        papers, raw, stored = conn.execute(
+            "SELECT count(*), coalesce(sum(raw_bytes), 0), coalesce(sum(stored_bytes), 0) FROM processed_papers"
+        ).fetchone()
+        conn.close()
+        return {"papers": papers, "raw_bytes": raw, "stored_bytes": stored}
+
+
+def use_section_store(backend: Optional[str] = None) -> bool:
+    return (backend or PROCESSED_BACKEND) == "sqlite"
+
+
+_default_store: Optional[SectionStore] = None
+
+
+def get_section_store() -> SectionStore:
+    global _default_store
+    if _default_store is None:
+        _default_store = SectionStore()
+    return _default_store
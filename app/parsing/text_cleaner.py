@@ -1,22 +1,86 @@
 import re
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Iterable, Iterator, List, Optional
+
+# Every cleaning rule as one alternation, applied in a single left-to-right scan.
+# Order matters: at a given position the first matching branch wins.
+_WS = r"[^\S\n]"  # whitespace other than a line break
+_CLEAN_RE = re.compile(
+    # cheap guard: every branch starts with a digit, "P", NUL, non-space
+    # whitespace, two whitespace chars, or a space at line start; ordinary
+    # letters and single inter-word spaces are rejected right here
+    r"(?=[^\S ]|[\dP\x00]| \s|^ )(?:"
+    # a line holding only a page number (plus any blank lines after it) -> drop
+    rf"(?P<pagenum>^{_WS}*\d+{_WS}*(?:\n|\Z)(?:{_WS}*\n)*)"
+    # indentation at the start of a line -> drop
+    rf"|(?P<indent>^{_WS}+)"
+    # "Page 12" running headers/footers -> drop
+    r"|(?P<page>\bPage\s+\d+\b)"
+    # line break with trailing spaces and/or blank lines after it -> single "\n"
+    # (a plain "\n" is left alone rather than replaced by itself)
+    rf"|(?P<newline>{_WS}+\n(?:{_WS}*\n)*|\n(?:{_WS}*\n)+)"
+    # runs of spaces/tabs -> single space (a lone " " already is one, so skip it)
+    rf"|(?P<space>(?: {_WS}|[^\S\n ]){_WS}*)"
+    # NUL bytes PyMuPDF sometimes emits -> drop
+    r"|(?P<nul>\x00+)"
+    r")",
+    re.MULTILINE,
+)
+
+_REPLACEMENTS = {
+    "pagenum": "",
+    "indent": "",
+    "page": "",
+    "newline": "\n",
+    "space": " ",
+    "nul": "",
+}
+
+
+def _replace(m: "re.Match") -> str:
+    return _REPLACEMENTS[m.lastgroup]
+
 
 def clean_text(text: str) -> str:
     """
     Light cleaning: remove repeated whitespace, page numbers, leftover latex.
+    Line breaks are kept so the section splitter can find heading lines.
+
+    All rules run in one pass of a single precompiled pattern.
     """
-    # Remove multiple spaces
-    text = re.sub(r'\s+', ' ', text)
+    return _CLEAN_RE.sub(_replace, text).strip()
+
+
+def clean_pages(pages):
+    """Apply clean_text to every page."""
+    return [clean_text(p) for p in pages]
 
-    # Remove common page number patterns
-    text = re.sub(r'\bPage\s+\d+\b', '', text)
-    text = re.sub(r'^\s*\d+\s*$', '', text, flags=re.MULTILINE)
 
-    # Strip weird unicode markers
-    text = text.replace("\x00", "").strip()
+def iter_clean_pages(pages: Iterable[str]) -> Iterator[str]:
+    """Lazily apply clean_text to pages as they are produced."""
+    for p in pages:
+        yield clean_text(p)
 
-    return text
 
+def clean_pages_batch(
+    pages: Iterable[str],
+    workers: int = 1,
+    chunksize: int = 256,
+    executor: Optional[Executor] = None,
+) -> List[str]:
+    """
+    Clean a large batch of pages, optionally across a process pool.
 
-def clean_pages(pages):
-    """Apply clean_text to every page."""
-    return [clean_text(p) for p in pages]
\ No newline at end of file
+    Pages are sent to workers `chunksize` at a time to amortise IPC. Pass an
+    existing `executor` to reuse a pool across calls; otherwise one is created
+    when `workers` > 1. With workers == 1 this is just clean_pages.
+    """
+    if executor is not None:
+        return list(executor.map(clean_text, pages, chunksize=chunksize))
+
+    pages = list(pages)
+    if workers <= 1 or len(pages) <= chunksize:
+        return clean_pages(pages)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(clean_text, pages, chunksize=chunksize))
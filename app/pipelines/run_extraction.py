@@ -1,11 +1,19 @@
 
 import os
 import json
-from typing import Dict, Any
+import queue
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Any, List, Optional, Tuple
 
 from app.agents.extraction_agent import ExtractionAgent
+from app.agents.hedging import HEDGE_STATS
+from app.agents.json_repair import JSON_STATS
+from app.agents.llm_scheduler import RetryQueue, get_scheduler
 from app.db import get_connection
-from app.config import LLM_PROVIDER, GEMINI_MODEL
+from app.config import EXTRACTION_MAX_ATTEMPTS, EXTRACTION_WORKERS, LLM_HEDGE_PROVIDER, LLM_PROVIDER, GEMINI_MODEL
+from app.parsing.section_store import get_section_store, use_section_store
 
 PROCESSED_DIR = os.path.join("data", "processed")
 EXTRACTED_DIR = os.path.join("data", "extracted")
@@ -23,6 +31,25 @@ def save_json(path: str, data: Dict[str, Any]):
         json.dump(data, f, indent=2)
 
 
+def list_processed_papers() -> List[Tuple[str, Callable[[], Dict[str, Any]]]]:
+    """
+    (filename, loader) for every processed paper in the configured backend.
+    Loaders are lazy, so a skipped paper is never read or decompressed.
+    """
+    if use_section_store():
+        store = get_section_store()
+        return [
+            (f"{paper_id}_{arxiv_id}.json", lambda pid=paper_id: store.load_paper(pid))
+            for paper_id, arxiv_id in store.list_papers()
+        ]
+
+    return [
+        (f, lambda path=os.path.join(PROCESSED_DIR, f): load_json(path))
+        for f in os.listdir(PROCESSED_DIR)
+        if f.endswith(".json")
+    ]
+
+
 def already_extracted(output_path: str) -> bool:
     """
     Check whether extraction output already exists.
@@ -33,9 +60,12 @@ def already_extracted(output_path: str) -> bool:
 def insert_extraction_into_db(
     paper_id: int,
     arxiv_id: str,
-    extraction: dict
+    extraction: dict,
+    conn=None,
 ):
-    conn = get_connection()
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
     cur = conn.cursor()
 
     cur.execute(
@@ -71,54 +101,191 @@ def insert_extraction_into_db(
     )
 
     conn.commit()
-    conn.close()
+    if own_conn:
+        conn.close()
 
-def run_extraction():
-    agent = ExtractionAgent()
 
-    files = [
-        f for f in os.listdir(PROCESSED_DIR)
-        if f.endswith(".json")
-    ]
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list (q in 0..100)."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(q / 100 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def latency_summary(latencies: List[float]) -> str:
+    values = sorted(latencies)
+    return (
+        f"p50={percentile(values, 50):.2f}s p90={percentile(values, 90):.2f}s "
+        f"p99={percentile(values, 99):.2f}s max={values[-1] if values else 0.0:.2f}s"
+    )
+
+
+def _writer_loop(writes: "queue.Queue", counts: Dict[str, int]):
+    """
+    The only place extraction results are persisted: JSON artifact, then DB
+    row, over one connection. A None item ends the loop.
+    """
+    conn = get_connection()
+    try:
+        while True:
+            item = writes.get()
+            if item is None:
+                break
+            filename, output_path, paper_id, arxiv_id, extracted = item
+            try:
+                # Save JSON artifact
+                save_json(output_path, extracted)
+                print(f"[extract] Saved extraction → {output_path}")
+
+                # Persist to DB
+                insert_extraction_into_db(
+                    paper_id=paper_id,
+                    arxiv_id=arxiv_id,
+                    extraction=extracted,
+                    conn=conn,
+                )
+                print(f"[extract] Inserted extraction into DB for paper_id={paper_id}")
+                counts["ok"] += 1
+            except Exception as e:
+                print(f"[extract] ERROR saving {filename}: {e}")
+                counts["failed"] += 1
+    finally:
+        conn.close()
 
-    if not files:
+
+def run_extraction(workers: Optional[int] = None):
+    """
+    Extract every processed paper that has no extraction yet.
+
+    Up to `workers` (default EXTRACTION_WORKERS) LLM requests are in flight
+    at once, each on its own agent. Finished extractions go through a
+    bounded queue to a single writer thread that owns the DB connection;
+    when the writer falls behind, workers wait instead of piling up results.
+    Papers that fail with a retryable error (rate limit, 5xx, timeout) after
+    the agent's own retries are re-queued with backoff, up to
+    EXTRACTION_MAX_ATTEMPTS tries, while the rest of the batch keeps going.
+    Ends with per-paper latency percentiles and how many responses needed
+    JSON repair.
+    """
+    workers = max(1, workers or EXTRACTION_WORKERS)
+    papers = list_processed_papers()
+
+    if not papers:
         print("[extract] No processed papers found.")
         return
 
-    print(f"[extract] Found {len(files)} processed papers.")
+    print(f"[extract] Found {len(papers)} processed papers.")
 
-    for filename in files:
-        input_path = os.path.join(PROCESSED_DIR, filename)
+    todo = []
+    for filename, load_paper in papers:
         output_path = os.path.join(EXTRACTED_DIR, filename)
 
         if already_extracted(output_path):
             print(f"[extract] Skipping already extracted: {filename}")
             continue
+        todo.append((filename, output_path, load_paper))
+
+    if not todo:
+        return
+
+    workers = min(workers, len(todo))
+    # One agent per in-flight request; created up front so config errors surface immediately
+    agents: "queue.Queue[ExtractionAgent]" = queue.Queue()
+    for _ in range(workers):
+        agents.put(ExtractionAgent())
 
+    def _extract(filename: str, load_paper) -> Tuple[Dict[str, Any], Dict[str, Any], float, Optional[float]]:
+        agent = agents.get()
         try:
-            paper_json = load_json(input_path)
+            started = time.perf_counter()
+            paper_json = load_paper()
             print(f"[extract] Extracting from {filename}...")
-
             extracted = agent.extract(paper_json)
+            ttft = (agent.last_call or {}).get("ttft_s")
+            return paper_json, extracted, time.perf_counter() - started, ttft
+        finally:
+            agents.put(agent)
 
-            # Save JSON artifact
-            save_json(output_path, extracted)
-            print(f"[extract] Saved extraction → {output_path}")
-
-            # Persist to DB 
-            paper_id = paper_json.get("paper_id")
-            arxiv_id = paper_json.get("arxiv_id")
+    writes: "queue.Queue" = queue.Queue(maxsize=workers * 2)
+    counts = {"ok": 0, "failed": 0}
+    writer = threading.Thread(target=_writer_loop, args=(writes, counts), name="extract-writer", daemon=True)
+    writer.start()
 
-            insert_extraction_into_db(
-                paper_id=paper_id,
-                arxiv_id=arxiv_id,
-                extraction=extracted,
-            )
+    if workers > 1:
+        print(f"[extract] Using {workers} concurrent requests")
+    latencies: List[float] = []
+    ttfts: List[float] = []
+    failed = 0  # LLM-side failures; the writer counts its own
+    started = time.perf_counter()
+    pending = iter(todo)
+    retries: RetryQueue = RetryQueue(EXTRACTION_MAX_ATTEMPTS)
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            in_flight = {}
+            while True:
+                # Retries that are due go first, then new papers
+                while len(in_flight) < workers:
+                    ready = retries.pop_ready()
+                    if ready is None:
+                        job = next(pending, None)
+                        if job is None:
+                            break
+                        ready = (job, 0)
+                    job, tries = ready
+                    filename, output_path, load_paper = job
+                    fut = pool.submit(_extract, filename, load_paper)
+                    in_flight[fut] = (job, tries + 1)
+                if not in_flight:
+                    due_in = retries.next_due_in()
+                    if due_in is None:
+                        break
+                    time.sleep(due_in)
+                    continue
 
-            print(f"[extract] Inserted extraction into DB for paper_id={paper_id}")
+                done, _ = wait(in_flight, timeout=retries.next_due_in(), return_when=FIRST_COMPLETED)
+                for fut in done:
+                    job, tries = in_flight.pop(fut)
+                    filename, output_path, _ = job
+                    try:
+                        paper_json, extracted, seconds, ttft = fut.result()
+                    except Exception as e:
+                        delay = retries.schedule(job, tries, e)
+                        if delay is not None:
+                            print(
+                                f"[extract] {filename} failed ({e}); retrying in {delay:.1f}s "
+                                f"(attempt {tries + 1}/{EXTRACTION_MAX_ATTEMPTS})"
+                            )
+                            continue
+                        print(f"[extract] ERROR processing {filename}: {e}")
+                        failed += 1
+                        continue
+                    latencies.append(seconds)
+                    if ttft is not None:
+                        ttfts.append(ttft)
+                    # Blocks while the writer is behind (backpressure)
+                    writes.put((
+                        filename,
+                        output_path,
+                        paper_json.get("paper_id"),
+                        paper_json.get("arxiv_id"),
+                        extracted,
+                    ))
+    finally:
+        writes.put(None)
+        writer.join()
 
-        except Exception as e:
-            print(f"[extract] ERROR processing {filename}: {e}")
+    elapsed = time.perf_counter() - started
+    print(
+        f"[extract] Extracted {counts['ok']} papers ({failed + counts['failed']} failed) in {elapsed:.1f}s; "
+        f"per-paper latency {latency_summary(latencies)}"
+    )
+    if ttfts:
+        print(f"[extract] Time to first token: {latency_summary(ttfts)}")
+    print(f"[extract] {JSON_STATS.describe()}")
+    print(f"[extract] LLM calls – {get_scheduler(LLM_PROVIDER).describe()}")
+    if LLM_HEDGE_PROVIDER:
+        print(f"[extract] Hedging – {HEDGE_STATS.describe()}")
 
 
 if __name__ == "__main__":
@@ -15,6 +15,9 @@ UI layers (Streamlit / CLI) should call this.
 from typing import Optional
 import os
 
+from app.agents.llm_cache import get_llm_cache
+from app.db import init_db
+from app.ingestion.arxiv_cache import get_arxiv_cache
 from app.ingestion.search_papers import search_papers
 from app.parsing.parse_all_pdfs import parse_all
 from app.pipelines.run_extraction import run_extraction as run_extraction_fn
@@ -38,11 +41,15 @@ def run_pipeline(
 
     print(f"[pipeline] Starting pipeline for topic='{topic}'")
 
+    # Idempotent; makes sure tables added since the DB was created exist
+    init_db()
+
     # --------------------
     # 1. Ingestion
     # --------------------
     print("[pipeline] Step 1/5: Searching arXiv")
     search_papers(topic, max_results=max_papers)
+    print(f"[pipeline] arXiv cache: {get_arxiv_cache().summary()}")
 
     # --------------------
     # 2. Parsing
@@ -82,6 +89,7 @@ def run_pipeline(
     else:
         print("[pipeline] Step 5/5: Skipped critic")
 
+    print(f"[pipeline] LLM cache: {get_llm_cache().summary()}")
     print("[pipeline] Pipeline completed.")
     return synthesis_path
 
@@ -1,8 +1,9 @@
 """
 Synthesis stage runner.
 
-Reads paper extractions from SQLite for a given topic, runs the SynthesisAgent,
-and saves a synthesis JSON artifact to data/synthesis/.
+Reads paper extractions from SQLite for a given topic (or for the papers whose
+parsed text matches a content query), runs the SynthesisAgent, and saves a
+synthesis JSON artifact to data/synthesis/.
 
 Returns the saved synthesis path (string) or "" if no matching extractions exist.
 """
@@ -10,42 +11,36 @@ Returns the saved synthesis path (string) or "" if no matching extractions exist
 import json
 import os
 from datetime import datetime
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
 from app.db import get_connection
 from app.agents.synthesis_agent import SynthesisAgent
+from app.parsing.section_index import search_paper_ids
 
 SYNTHESIS_DIR = os.path.join("data", "synthesis")
 os.makedirs(SYNTHESIS_DIR, exist_ok=True)
 
 
-def fetch_extractions_for_topic(topic: str) -> List[Dict[str, Any]]:
-    """
-    Fetch extractions joined with paper metadata for a topic.
-    Uses partial, case-insensitive matching so 'LLM jailbreak' matches
-    'LLM jailbreak defense', etc.
-    """
+_EXTRACTIONS_SQL = """
+    SELECT
+        p.id as paper_id,
+        p.arxiv_id as arxiv_id,
+        p.title as title,
+        p.topic as topic,
+        e.task as task,
+        e.model_provider as model_provider,
+        e.model_name as model_name,
+        e.raw_extraction_json as extraction_json,
+        e.extracted_at as extracted_at
+    FROM paper_extractions e
+    JOIN papers p ON p.id = e.paper_id
+"""
+
+
+def _fetch_extractions(where: str, params: tuple) -> List[Dict[str, Any]]:
     conn = get_connection()
     cur = conn.cursor()
-    cur.execute(
-        """
-        SELECT
-            p.id as paper_id,
-            p.arxiv_id as arxiv_id,
-            p.title as title,
-            p.topic as topic,
-            e.task as task,
-            e.model_provider as model_provider,
-            e.model_name as model_name,
-            e.raw_extraction_json as extraction_json,
-            e.extracted_at as extracted_at
-        FROM paper_extractions e
-        JOIN papers p ON p.id = e.paper_id
-        WHERE lower(p.topic) LIKE lower(?)
-        ORDER BY p.id ASC, e.id ASC
-        """,
-        (f"%{topic}%",),
-    )
+    cur.execute(f"{_EXTRACTIONS_SQL} WHERE {where} ORDER BY p.id ASC, e.id ASC", params)
     rows = cur.fetchall()
     cols = [d[0] for d in cur.description]
     conn.close()
@@ -66,6 +61,31 @@ def fetch_extractions_for_topic(topic: str) -> List[Dict[str, Any]]:
     return out
 
 
+def fetch_extractions_for_topic(topic: str) -> List[Dict[str, Any]]:
+    """
+    Fetch extractions joined with paper metadata for a topic.
+    Uses partial, case-insensitive matching so 'LLM jailbreak' matches
+    'LLM jailbreak defense', etc.
+    """
+    return _fetch_extractions("lower(p.topic) LIKE lower(?)", (f"%{topic}%",))
+
+
+def fetch_extractions_for_query(query: str, limit: int = 50) -> List[Dict[str, Any]]:
+    """
+    Fetch extractions for the papers whose parsed text best matches a content
+    query (full-text search over sections), best match first.
+    """
+    paper_ids = search_paper_ids(query, limit=limit)
+    if not paper_ids:
+        return []
+
+    placeholders = ",".join("?" for _ in paper_ids)
+    rows = _fetch_extractions(f"p.id IN ({placeholders})", tuple(paper_ids))
+    rank = {pid: i for i, pid in enumerate(paper_ids)}
+    rows.sort(key=lambda r: rank[r["paper_id"]])
+    return rows
+
+
 def list_available_topics() -> List[str]:
     conn = get_connection()
     cur = conn.cursor()
@@ -82,8 +102,22 @@ def list_available_topics() -> List[str]:
     return topics
 
 
-def run(topic: str) -> str:
-    papers = fetch_extractions_for_topic(topic)
+def run(topic: str, content_query: Optional[str] = None) -> str:
+    """
+    Synthesize extractions for `topic`. With `content_query`, papers are
+    selected by full-text search over their sections instead of the topic
+    column; `topic` then only names the synthesis.
+    """
+    if content_query:
+        papers = fetch_extractions_for_query(content_query)
+        selection = f"content query {content_query!r}"
+    else:
+        papers = fetch_extractions_for_topic(topic)
+        selection = f"topic~={topic!r}"
+
+    if not papers and content_query:
+        print(f"[synth] No extracted papers match {selection}.")
+        return ""
 
     if not papers:
         print(f"[synth] No extractions found in DB for topic~={topic!r} (partial, case-insensitive match).")
@@ -100,7 +134,7 @@ def run(topic: str) -> str:
         print("[synth] Tip: run `sqlite3 research.db \"SELECT DISTINCT topic FROM papers;\"`")
         return ""
 
-    print(f"[synth] Found {len(papers)} extractions for topic~={topic!r}")
+    print(f"[synth] Found {len(papers)} extractions for {selection}")
 
     agent = SynthesisAgent()
     synthesis: Dict[str, Any] = agent.synthesize(topic=topic, papers=papers)
@@ -119,8 +153,15 @@ def run(topic: str) -> str:
 if __name__ == "__main__":
     import sys
 
-    if len(sys.argv) < 2:
-        print("Usage: python -m app.pipelines.run_synthesis \"<topic>\"")
+    args = sys.argv[1:]
+    content_query = None
+    if "--query" in args:
+        i = args.index("--query")
+        content_query = args[i + 1] if i + 1 < len(args) else None
+        args = args[:i] + args[i + 2:]
+
+    if not args:
+        print("Usage: python -m app.pipelines.run_synthesis \"<topic>\" [--query \"<content query>\"]")
         raise SystemExit(1)
 
-    run(sys.argv[1])
\ No newline at end of file
+    run(args[0], content_query=content_query)
\ No newline at end of file
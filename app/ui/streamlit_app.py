@@ -5,7 +5,7 @@ import os
 
 from app.pipelines.run_full_pipeline import run_pipeline
 import shutil
-from app.db import get_connection
+from app.db import get_connection, init_db
 
 import sys
 from contextlib import redirect_stdout
@@ -40,10 +40,14 @@ def reset_workspace(wipe_raw_pdfs: bool = False) -> None:
     Clears DB rows and pipeline artifacts so each run starts fresh (schema is preserved).
     """
     # Reset DB rows
+    init_db()
     conn = get_connection()
     cur = conn.cursor()
     cur.execute("DELETE FROM paper_extractions;")
     cur.execute("DELETE FROM papers;")
+    cur.execute("DELETE FROM arxiv_cursors;")
+    cur.execute("DELETE FROM parse_manifest;")
+    cur.execute("DELETE FROM paper_sections;")
     cur.execute("DELETE FROM sqlite_sequence WHERE name IN ('papers', 'paper_extractions');")
     conn.commit()
     conn.close()